@@ -231,6 +231,13 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# https://docs.djangoproject.com/en/dev/ref/settings/#file-upload-handlers
+# Always stream uploads to a temporary file instead of holding small ones in memory.
+# `FileSystemStorage` then moves the temporary file into MEDIA_ROOT (a rename on the
+# same filesystem) rather than writing the upload out again chunk by chunk
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -279,7 +286,6 @@ TEMPLATES = [
 COMPONENTS = {
     "dirs": [],
     "app_dirs": ["components"],
-    "reload_on_template_change": True,
 }
 
 CRISPY_TEMPLATE_PACK = "tailwind"
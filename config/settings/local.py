@@ -1,4 +1,5 @@
 from .base import *  # noqa: F403
+from .base import COMPONENTS
 from .base import INSTALLED_APPS
 from .base import MIDDLEWARE
 from .base import env
@@ -88,7 +89,7 @@ INSTALLED_APPS += ["django_extensions"]
 MIDDLEWARE += ["django_browser_reload.middleware.BrowserReloadMiddleware"]
 INSTALLED_APPS += ["django_browser_reload"]
 # Reload on any file change (including components)
-reload_on_file_change = True
+COMPONENTS["reload_on_file_change"] = True
 
 # django-watchfiles
 # ------------------------------------------------------------------------------
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TesysTagboardConfig(AppConfig):
     name = "tesys_tagboard"
     verbose_name = "Tesy's Tagboard"
+
+    def ready(self):
+        import tesys_tagboard.signals  # noqa: F401, PLC0415
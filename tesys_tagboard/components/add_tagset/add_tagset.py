@@ -13,9 +13,10 @@ class AddTagsetComponent(Component):
 
     def get_template_data(self, args, kwargs, slots, context):
         size: str = kwargs.get("size")
-        post_url: str = kwargs.get("post_url", reverse("confirm-tagset"))
-        autocomplete_url: str = kwargs.get(
-            "autocomplete_url", reverse("tag-autocomplete")
+        # Only reverse the default URLs when they aren't passed in
+        post_url: str = kwargs.get("post_url") or reverse("confirm-tagset")
+        autocomplete_url: str = kwargs.get("autocomplete_url") or reverse(
+            "tag-autocomplete"
         )
         add_tag_enabled: bool = kwargs.get("add_tag_enabled")
 
@@ -1,7 +1,7 @@
 from django_components import Component
 from django_components import register
 
-from tesys_tagboard.enums import RatingLevel
+from tesys_tagboard.enums import RATING_LEVELS
 
 
 @register("create_tag")
@@ -11,4 +11,4 @@ class CreateTagComponent(Component):
 
     def get_template_data(self, args, kwargs, slots, context):
         categories = kwargs.get("categories")
-        return {"categories": categories, "rating_levels": list(RatingLevel)}
+        return {"categories": categories, "rating_levels": RATING_LEVELS}
@@ -1,3 +1,4 @@
+import functools
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
@@ -32,6 +33,14 @@ class Action:
         return render_to_string(template_name, context={"action": self, **kwargs})
 
 
+_TAG_ID_TOKEN_NAME = PostSearchTokenCategory.TAG_ID.value.name
+
+
+@functools.lru_cache(maxsize=1)
+def _posts_url() -> str:
+    return reverse("posts")
+
+
 @register("tag")
 class TagComponent(Component):
     template_file = "tag.html"
@@ -47,60 +56,62 @@ class TagComponent(Component):
         size = kwargs.get("size")
         category = tag.category
         extra_actions = kwargs.get("actions", [])
-        search_query = (
-            f"{reverse('posts')}?q={PostSearchTokenCategory.TAG_ID.value.name}={tag.pk}"
-        )
-        search_action = Action(
-            "search",
-            display=_("Search"),
-            desc=_("Search for posts with this tag"),
-            tag=tag,
-            arg=search_query,
-        )
-
-        update_tag_action = Action(
-            "update-tag",
-            display=_("Update tag"),
-            desc=_("Update this tag"),
-            tag=tag,
-        )
-
-        delete_tag_action = Action(
-            "delete-tag",
-            display=_("Delete tag"),
-            desc=_("Delete this tag from all posts"),
-            tag=tag,
-        )
-
-        actions = [search_action]
-
-        if perms and perms["tesys_tagboard"]["change_tag"]:
-            actions.append(update_tag_action)
-
-        if perms and perms["tesys_tagboard"]["delete_tag"]:
-            actions.append(delete_tag_action)
-
-        if alias:
-            update_alias_action = Action(
-                "update-alias",
-                display=_("Update alias"),
-                desc=_("Update this tag alias"),
+        search_query = f"{_posts_url()}?q={_TAG_ID_TOKEN_NAME}={tag.pk}"
+        actions = [
+            Action(
+                "search",
+                display=_("Search"),
+                desc=_("Search for posts with this tag"),
                 tag=tag,
-                alias=alias,
+                arg=search_query,
             )
-            delete_alias_action = Action(
-                "delete-alias",
-                display=_("Delete alias"),
-                desc=_("Delete this tag alias"),
-                tag=tag,
-                alias=alias,
+        ]
+
+        # Tags are rendered many times per gallery page, so only build the
+        # actions the user is allowed to use
+        app_perms = perms["tesys_tagboard"] if perms else None
+        if app_perms and app_perms["change_tag"]:
+            actions.append(
+                Action(
+                    "update-tag",
+                    display=_("Update tag"),
+                    desc=_("Update this tag"),
+                    tag=tag,
+                )
             )
 
-            if perms and perms["tesys_tagboard"]["change_tagalias"]:
-                actions.append(update_alias_action)
+        if app_perms and app_perms["delete_tag"]:
+            actions.append(
+                Action(
+                    "delete-tag",
+                    display=_("Delete tag"),
+                    desc=_("Delete this tag from all posts"),
+                    tag=tag,
+                )
+            )
 
-            if perms and perms["tesys_tagboard"]["delete_tagalias"]:
-                actions.append(delete_alias_action)
+        if alias:
+            if app_perms and app_perms["change_tagalias"]:
+                actions.append(
+                    Action(
+                        "update-alias",
+                        display=_("Update alias"),
+                        desc=_("Update this tag alias"),
+                        tag=tag,
+                        alias=alias,
+                    )
+                )
+
+            if app_perms and app_perms["delete_tagalias"]:
+                actions.append(
+                    Action(
+                        "delete-alias",
+                        display=_("Delete alias"),
+                        desc=_("Delete this tag alias"),
+                        tag=tag,
+                        alias=alias,
+                    )
+                )
 
         actions.extend(extra_actions)
 
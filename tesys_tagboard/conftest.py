@@ -1,5 +1,6 @@
 import pytest
-from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import Client
 
 from tesys_tagboard.models import Tag
 from tesys_tagboard.models import TagAlias
@@ -19,6 +20,23 @@ def _media_storage(settings, tmpdir) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """Don't leak cached data between tests, since their DB changes are rolled back"""
+    yield
+    cache.clear()
+
+
+@pytest.fixture(scope="session")
+def ro_client() -> Client:
+    """A test client shared across the session for anonymous, read-only requests
+
+    Don't use this client for tests which log in or otherwise modify the client's
+    session or cookies, use the default `client` fixture instead.
+    """
+    return Client()
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
@@ -26,89 +44,67 @@ def user(db) -> User:
 
 @pytest.fixture
 def user_with_add_post(db) -> User:
-    return UserFactory().with_permissions([Permission.objects.get(codename="add_post")])
+    return UserFactory.create_with_perms("add_post")
 
 
 @pytest.fixture
 def user_with_add_tag(db) -> User:
-    return UserFactory().with_permissions([Permission.objects.get(codename="add_tag")])
+    return UserFactory.create_with_perms("add_tag")
 
 
 @pytest.fixture
 def user_with_add_tagalias(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="add_tagalias")]
-    )
+    return UserFactory.create_with_perms("add_tagalias")
 
 
 @pytest.fixture
 def user_with_delete_post(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="delete_post")]
-    )
+    return UserFactory.create_with_perms("delete_post")
 
 
 @pytest.fixture
 def user_with_change_post(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="change_post")]
-    )
+    return UserFactory.create_with_perms("change_post")
 
 
 @pytest.fixture
 def user_with_lock_comments(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="lock_comments")]
-    )
+    return UserFactory.create_with_perms("lock_comments")
 
 
 @pytest.fixture
 def user_with_add_comment(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="add_comment")]
-    )
+    return UserFactory.create_with_perms("add_comment")
 
 
 @pytest.fixture
 def user_with_change_comment(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="change_comment")]
-    )
+    return UserFactory.create_with_perms("change_comment")
 
 
 @pytest.fixture
 def user_with_delete_comment(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="delete_comment")]
-    )
+    return UserFactory.create_with_perms("delete_comment")
 
 
 @pytest.fixture
 def user_with_add_collection(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="add_collection")]
-    )
+    return UserFactory.create_with_perms("add_collection")
 
 
 @pytest.fixture
 def user_with_delete_collection(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="delete_collection")]
-    )
+    return UserFactory.create_with_perms("delete_collection")
 
 
 @pytest.fixture
 def user_with_add_favorite(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="add_favorite")]
-    )
+    return UserFactory.create_with_perms("add_favorite")
 
 
 @pytest.fixture
 def user_with_delete_favorite(db) -> User:
-    return UserFactory().with_permissions(
-        [Permission.objects.get(codename="delete_favorite")]
-    )
+    return UserFactory.create_with_perms("delete_favorite")
 
 
 @pytest.fixture(scope="session")
@@ -35,6 +35,10 @@ class RatingLevel(IntegerChoices):
         return selected_ratings[0]
 
 
+# Every rating level in ascending order, e.g. for rating level choices in templates
+RATING_LEVELS: tuple[RatingLevel, ...] = tuple(RatingLevel)
+
+
 class MediaCategory(StrEnum):
     """MIME media content type"""
 
@@ -97,21 +101,25 @@ class SupportedMediaType(Enum):
     def select_by_mime(cls, template: str) -> Self | None:
         """A function to select the supported media type by the given MIME type template
         string. Returns the first matched instance of SupportedMediaTypes"""
-        for smt in cls:
-            if template == smt.value.get_mimetype():
-                return smt
-
-        return None
+        return _MEDIA_TYPES_BY_MIME.get(template)
 
     @classmethod
     def select_by_ext(cls, template: str) -> Self | None:
         """A function to select the supported media type matching the given extension.
         Returns the first matched instance of SupportedMediaTypes"""
-        for smt in cls:
-            if template in smt.value.extensions:
-                return smt
-
-        return None
+        return _MEDIA_TYPES_BY_EXT.get(template)
+
+
+# Lookup tables for `SupportedMediaType.select_by_mime` and `select_by_ext`. Members
+# are visited in definition order and `setdefault` keeps the first match for MIME
+# types and extensions that are shared (e.g. "mpeg")
+_MEDIA_TYPES_BY_MIME: dict[str, SupportedMediaType] = {}
+_MEDIA_TYPES_BY_EXT: dict[str, SupportedMediaType] = {}
+for _smt in SupportedMediaType:
+    _MEDIA_TYPES_BY_MIME.setdefault(_smt.value.get_mimetype(), _smt)
+    for _ext in _smt.value.extensions:
+        _MEDIA_TYPES_BY_EXT.setdefault(_ext, _smt)
+del _smt, _ext
 
 
 class TokenArgRelation(Enum):
@@ -122,7 +122,8 @@ class PostForm(forms.Form):
         validators=[URLValidator(["https", "http", "ftp"])],
     )
     rating_level = forms.ChoiceField(choices=RatingLevel.choices, required=False)
-    tagset = TagsetField(required=False, widget=forms.HiddenInput)
+    # Reads every "tagset" value so the form can be bound to `request.POST` directly
+    tagset = TagsetField(required=False, widget=forms.MultipleHiddenInput)
 
 
 class AddCommentForm(forms.Form):
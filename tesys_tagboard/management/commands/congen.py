@@ -9,7 +9,6 @@ from random import sample
 from typing import TYPE_CHECKING
 from typing import Annotated
 
-import magic
 import typer
 from django.conf import settings
 from django.contrib.auth.models import Group
@@ -40,7 +39,6 @@ from tesys_tagboard.models import TagCategory
 from tesys_tagboard.models import Video
 from tesys_tagboard.models import add_tag_history
 from tesys_tagboard.models import update_tag_post_counts
-from tesys_tagboard.upload import fix_upload_content_type
 from tesys_tagboard.users.models import User
 from tesys_tagboard.validators import media_file_supported_validator
 
@@ -410,17 +408,16 @@ def create_random_posts(  # noqa: C901, PLR0912, PLR0915
     ):
         fp = file.open("rb")
         uploaded_file = UploadedFile(fp)
-        magic_mime = magic.from_file(file, mime=True)
         try:
+            # Also detects the file's content type from its contents
             media_file_supported_validator(uploaded_file)
-            uploaded_file = fix_upload_content_type(uploaded_file)
         except ValidationError as err:
             console.print(
                 f"File '{file.name}' couldn't be validated because: {err.message}"
             )
             continue
 
-        smt = SupportedMediaType.select_by_mime(magic_mime)
+        smt = SupportedMediaType.select_by_mime(uploaded_file.content_type)
         if smt is None:
             console.print(f"The file type of '{file}' is not supported")
             continue
@@ -494,7 +491,7 @@ def create_random_posts(  # noqa: C901, PLR0912, PLR0915
     console.print("Tags added to posts.")
 
     for post in track(created_posts, description="Updating posts' tag histories..."):
-        add_tag_history(post.tags.all(), post, post.uploader)
+        add_tag_history(post.tags.values_list("pk", flat=True), post, post.uploader)
 
     for post in track(created_posts, description="Updating posts' source histories..."):
         post.save_with_src_history(post.uploader, post.src_url)
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.3 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tesys_tagboard', '0012_alter_collection_desc_alter_collection_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['post_date', 'id'], name='post_date_id_idx'),
+        ),
+    ]
@@ -1,8 +1,7 @@
 """Models for Tesys's Tagboard"""
 
-import re
+import hashlib
 import uuid
-from hashlib import md5
 from io import BytesIO
 from typing import TYPE_CHECKING
 
@@ -11,19 +10,19 @@ from colorfield.fields import ColorField
 from django.conf import settings
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.indexes import HashIndex
+from django.contrib.postgres.indexes import OpClass
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.validators import MaxLengthValidator
 from django.db import models
-from django.db.models import BooleanField
-from django.db.models import Case
+from django.db.models import Exists
 from django.db.models import OuterRef
 from django.db.models import Prefetch
 from django.db.models import Q
 from django.db.models import QuerySet
 from django.db.models import Subquery
-from django.db.models import Value
-from django.db.models import When
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
@@ -34,7 +33,7 @@ from config.settings.base import AUTH_USER_MODEL
 from .enums import MediaCategory
 from .enums import RatingLevel
 from .enums import SupportedMediaType
-from .upload import get_file_content_type
+from .upload import sniff_content_type
 from .validators import collection_name_validator
 from .validators import dhash_validator
 from .validators import md5_validator
@@ -46,6 +45,7 @@ if TYPE_CHECKING:
     from collections.abc import Iterable
     from collections.abc import Sequence
 
+    from django.core.files import File
     from users.models import User
 
 from django.db.models import Lookup
@@ -167,6 +167,10 @@ class TagManager(models.Manager):
         """Retrive Tags excluding any filtered tags from the User's settings"""
         return self.get_queryset().for_user(user)
 
+    def with_gallery_data(self):
+        """Return tags with only the data needed to display them in a post gallery"""
+        return self.get_queryset().with_gallery_data()
+
 
 class TagQuerySet(models.QuerySet):
     def for_post(self, post: Post):
@@ -177,12 +181,17 @@ class TagQuerySet(models.QuerySet):
 
     def as_list(self) -> list[int]:
         """Return a list of IDs of a TagQuerySet"""
-        return [t.pk for t in self]
+        return list(self.values_list("pk", flat=True))
 
     def for_user(self, user: User):
         filter_tag_ids = user.filter_tags.values_list("pk", flat=True)
         return self.exclude(pk__in=filter_tag_ids)
 
+    def with_gallery_data(self):
+        return self.select_related("category").only(
+            "name", "id", "category", "post_count"
+        )
+
 
 class Artist(models.Model):
     """Model for Artists to identify all artwork from a particular source"""
@@ -203,7 +212,9 @@ def media_upload_path(instance, original_filename: str) -> str:
     """Generate a unique upload path for a Media file"""
     random_filename = str(uuid.uuid4())
     now = timezone.now()
-    mimetype = get_file_content_type(instance.file)
+    # The mimetype is detected from the file's contents before the media is
+    # created, so the file only needs to be sniffed again when it's missing
+    mimetype = instance.mimetype or sniff_content_type(instance.file)
     if smt := SupportedMediaType.select_by_mime(mimetype):
         return f"uploads/{now.year}/{now.month}/{now.day}/{random_filename}.{smt.value.extensions[0]}"  # noqa: E501
     msg = (
@@ -220,6 +231,11 @@ def media_thumbnail_upload_path(instance, filename: str) -> str:
     return f"thumbnails/{now.year}/{now.month}/{now.day}/{filename}.png"
 
 
+def file_md5(file: File) -> str:
+    """Return the MD5 hash of a `file` read in chunks rather than all at once"""
+    return hashlib.file_digest(file.open(), "md5").hexdigest()
+
+
 def unique_filename(instance, filename: str) -> str:
     """Generate a unique (UUID) filename"""
     filename_split = filename.split(".")
@@ -246,16 +262,15 @@ def update_tag_post_counts():
     Tag.tags.bulk_update(tcount_tags, fields=["post_count"])
 
 
-def tags_to_csv(tags: Iterable[Tag]) -> str:
-    return ",".join([str(tag.pk) for tag in tags])
+def tag_ids_to_csv(tag_ids: Iterable[int]) -> str:
+    return ",".join(map(str, tag_ids))
 
 
 def csv_to_tag_ids(tags_csv: str) -> Sequence[int]:
     tags_csv = tags_csv.strip()
     try:
-        tag_ids = list(
-            map(int, re.split(r"\s*,\s*", tags_csv) if tags_csv != "" else [])
-        )
+        # int() ignores the whitespace around each ID by itself
+        tag_ids = [int(tag_id) for tag_id in tags_csv.split(",")] if tags_csv else []
     except ValueError as e:
         msg = f'The csv string "{tags_csv}" does not contain entirely valid Tag IDs'
         raise ValueError(msg) from e
@@ -286,8 +301,8 @@ class PostManager(models.Manager):
         """Adds the `favorited` annotation to a QuerySet of Posts"""
         return self.get_queryset().annotate_favorites(favorites)
 
-    def has_tags(self, tags: QuerySet[Tag]):
-        """Return Posts tagged with _all_ of the provided `tags`"""
+    def has_tags(self, tags: Iterable[Tag | int]):
+        """Return Posts tagged with _all_ of the provided `tags` (Tags or tag IDs)"""
         return self.get_queryset().has_tags(tags)
 
     def annotate_tag_count(self):
@@ -308,14 +323,10 @@ class PostManager(models.Manager):
 
 class PostQuerySet(models.QuerySet):
     def annotate_favorites(self, favorites: QuerySet[Favorite]):
+        # A correlated EXISTS is only evaluated for the rows that are returned,
+        # i.e. a single page of a paginated gallery
         return self.annotate(
-            favorited=Case(
-                When(
-                    pk__in=favorites.values_list("post", flat=True),
-                    then=Value(value=True),
-                ),
-                default=Value(value=False),
-            )
+            favorited=Exists(favorites.filter(post=OuterRef("pk"))),
         )
 
     def annotate_child_posts(self):
@@ -338,9 +349,7 @@ class PostQuerySet(models.QuerySet):
         return self.filter(media__id=media_id)
 
     def with_gallery_data(self, user: User):
-        prefetch_tags = Tag.tags.select_related("category").only(
-            "name", "id", "category", "post_count"
-        )
+        prefetch_tags = Tag.tags.with_gallery_data()
         posts = (
             self.defer(
                 "title",
@@ -352,28 +361,30 @@ class PostQuerySet(models.QuerySet):
             )
             .prefetch_related(
                 Prefetch("tags", queryset=prefetch_tags),
-                "collection_set",
             )
-            .select_related("image")
+            # Thumbnails check each media type, so join all of them to avoid
+            # a query per non-image post
+            .select_related("image", "audio", "video")
             .defer(
                 "image__orig_name",
                 "image__md5",
                 "image__phash",
                 "image__dhash",
+                "audio__orig_name",
+                "audio__md5",
+                "video__orig_name",
+                "video__md5",
             )
         )
         if user.is_authenticated:
-            post_blur_tag_overlap = (
-                Tag.tags.select_related("category")
-                .filter(post=OuterRef("pk"))
-                .only("pk")
-                .intersection(user.blur_tags.only("pk").all())
+            # Check the post's tags for any of the user's blur tags, stopping at
+            # the first match
+            post_blur_tags = Post.tags.through.objects.filter(
+                post=OuterRef("pk"), tag__in=user.blur_tags.all()
             )
             posts = posts.annotate(
                 blur_level=Q(rating_level__gte=user.blur_rating_level),
-                blur_tag=Subquery(
-                    post_blur_tag_overlap.values("pk"), output_field=BooleanField()
-                ),
+                blur_tag=Exists(post_blur_tags),
             )
             favorites = Favorite.favorites.for_user(user)
             posts = posts.exclude(tags__in=user.filter_tags.all()).annotate_favorites(
@@ -385,12 +396,24 @@ class PostQuerySet(models.QuerySet):
             )
         return posts
 
-    def has_tags(self, tags: QuerySet[Tag]):
-        filter_expr = self
-        for tag in tags:
-            filter_expr = filter_expr & self.filter(tags__in=[tag.pk])
-
-        return filter_expr
+    def has_tags(self, tags: Iterable[Tag | int]):
+        tag_ids = {tag.pk if isinstance(tag, Tag) else int(tag) for tag in tags}
+        if not tag_ids:
+            return self
+        if len(tag_ids) == 1:
+            return self.filter(tags=tag_ids.pop())
+
+        # Count the matching tags per post in a subquery rather than joining the
+        # tags table again for every tag. Keeping the join out of the outer query
+        # also leaves any other Count annotations on it unaffected.
+        tagged_post_ids = (
+            Post.tags.through.objects.filter(tag_id__in=tag_ids)
+            .values("post_id")
+            .annotate(matching_tag_count=models.Count("tag_id"))
+            .filter(matching_tag_count=len(tag_ids))
+            .values("post_id")
+        )
+        return self.filter(pk__in=tagged_post_ids)
 
     def annotate_comment_count(self):
         return self.annotate(comment_count=models.Count("comment"))
@@ -430,6 +453,9 @@ class Post(models.Model):
         verbose_name_plural = _("posts")
         permissions = [("lock_comments", "Can lock and unlock the comments of a post")]
         ordering = ["post_date"]
+        indexes = [
+            models.Index(fields=["post_date", "id"], name="post_date_id_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"<Post - id: {self.pk}; uploader: {self.uploader.username}; title: {self.title}; posted: {self.post_date}>"  # noqa: E501
@@ -439,19 +465,34 @@ class Post(models.Model):
         super().save(**kwargs)
         update_tag_post_counts()
 
-    def save_with_tag_history(self, user, tags: TagQuerySet):
-        """Saves the post with additional handling for tag history"""
-        add_tag_history(tags, self, user)
-        self.tags.set(tags)
-        self.save()
+    def save_with_tag_history(
+        self, user, tag_ids: Iterable[int], update_fields: Iterable[str] | None = None
+    ):
+        """Saves the post with additional handling for tag history
 
-    def save_with_src_history(self, user, src_url: str):
-        """Saves the Media with additional handling for source history"""
+        `tag_ids` is evaluated once and reused for both the tag history and the
+        post's tags. The tags are stored in their own table, so `update_fields`
+        only needs to name the post's edited columns
+        """
+        tag_ids = list(tag_ids)
+        add_tag_history(tag_ids, self, user)
+        self.tags.set(tag_ids)
+        self.save(update_fields=update_fields)
+
+    def save_with_src_history(
+        self, user, src_url: str, update_fields: Iterable[str] | None = None
+    ):
+        """Saves the Media with additional handling for source history
+
+        `src_url` is added to `update_fields` when the source changes
+        """
         source_hist = SourceHistory.objects.filter(post=self)
         if (self.src_url != src_url or not source_hist) and not src_url.isspace():
             SourceHistory(post=self, user=user, src_url=src_url).save()
             self.src_url = src_url
-        self.save()
+            if update_fields is not None:
+                update_fields = {*update_fields, "src_url"}
+        self.save(update_fields=update_fields)
 
     def tagset(self) -> set[int]:
         """Returns set of tag IDs"""
@@ -514,6 +555,15 @@ class Tag(models.Model):
                 nulls_distinct=False,
             ),
         ]
+        indexes = [
+            # Trigram index for the case insensitive substring matching used by
+            # tag autocompletion. `icontains` compares `UPPER(name)` on Postgres, so
+            # the index is on the same expression
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="tag_name_trgm_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         if category := self.category.get_full_path() if self.category else "":
@@ -568,6 +618,12 @@ class TagAlias(models.Model):
                 fields=["name", "tag"], name="unique_tagalias_name_tag"
             ),
         ]
+        indexes = [
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="tagalias_name_trgm_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"<TagAlias - {self.name}, tag: {self.tag}>"
@@ -586,12 +642,16 @@ class DefaultPostTag(models.Model):
         return f"<DefaultPostTag - {self.tag}>"
 
 
-def add_tag_history(tags: QuerySet[Tag], post: Post, user):
-    old_tags = set(post.tags.order_by("pk"))
-    new_tags = set(tags.all())
-    tag_histories = PostTagHistory.objects.filter(post=post)
-    if old_tags != new_tags or not tag_histories:
-        tag_hist = PostTagHistory(post=post, user=user, tags=tags_to_csv(tags.all()))
+def add_tag_history(tag_ids: Iterable[int], post: Post, user):
+    # Evaluate `tag_ids` only once in case it's a QuerySet. Only the IDs are
+    # compared and stored, so the tags themselves are never loaded
+    tag_ids = list(tag_ids)
+    old_tag_ids = set(post.tags.values_list("pk", flat=True))
+    if (
+        old_tag_ids != set(tag_ids)
+        or not PostTagHistory.objects.filter(post=post).exists()
+    ):
+        tag_hist = PostTagHistory(post=post, user=user, tags=tag_ids_to_csv(tag_ids))
         tag_hist.save()
 
 
@@ -645,10 +705,13 @@ class Image(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.md5 = md5(self.file.open().read()).hexdigest()  # noqa: S324
-        image_file = PIL_Image.open(self.file)
-        self.phash = str(imagehash.phash(image_file))
-        self.dhash = str(imagehash.dhash(image_file))
+        # Images loaded from the database (with positional field values)
+        # already have their hashes, only new images need to read the file
+        if not args:
+            self.md5 = file_md5(self.file)
+            image_file = PIL_Image.open(self.file)
+            self.phash = str(imagehash.phash(image_file))
+            self.dhash = str(imagehash.dhash(image_file))
 
     def __str__(self) -> str:
         return (
@@ -704,7 +767,9 @@ class Video(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.md5 = md5(self.file.open().read()).hexdigest()  # noqa: S324
+        # Only hash new files, see Image.__init__
+        if not args:
+            self.md5 = file_md5(self.file)
 
     def __str__(self) -> str:
         return f"<Video - file: {self.file}>"
@@ -736,7 +801,9 @@ class Audio(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.md5 = md5(self.file.open().read()).hexdigest()  # noqa: S324
+        # Only hash new files, see Image.__init__
+        if not args:
+            self.md5 = file_md5(self.file)
 
     def __str__(self) -> str:
         return f"<Audio - file: {self.file}>"
@@ -803,8 +870,13 @@ class CollectionQuerySet(models.QuerySet):
 
     def with_gallery_data(self):
         """Return optimized CollectionQuerySet including gallery data
-        such as related posts for the given user"""
-        return self.prefetch_related("posts").select_related("user")
+        such as related posts for the given user
+
+        Galleries only count the posts or check membership, so only their
+        IDs are loaded"""
+        return self.prefetch_related(
+            Prefetch("posts", queryset=Post.posts.only("pk"))
+        ).select_related("user")
 
 
 class Collection(models.Model):
@@ -839,8 +911,22 @@ class Collection(models.Model):
 
 class CommentQuerySet(models.QuerySet):
     def for_post(self, post_id: int):
-        """Returns comments for the specified `post_id`"""
-        return self.filter(post__pk=post_id).order_by("-post_date")
+        """Returns comments for the specified `post_id` with the data needed to
+        display them"""
+        return (
+            self.filter(post__pk=post_id)
+            .order_by("-post_date")
+            .select_related("user")
+            .only(
+                "id",
+                "text",
+                "post_date",
+                "edit_date",
+                "post_id",
+                "user__id",
+                "user__username",
+            )
+        )
 
 
 class Comment(models.Model):
@@ -894,8 +980,10 @@ class FavoriteQuerySet(models.QuerySet):
         return self.filter(user=user_id)
 
     def with_gallery_data(self):
-        return self.select_related("post", "post", "post__image").prefetch_related(
-            "post__tags"
+        return self.select_related(
+            "post", "post__image", "post__audio", "post__video"
+        ).prefetch_related(
+            Prefetch("post__tags", queryset=Tag.tags.with_gallery_data())
         )
 
 
@@ -0,0 +1,48 @@
+from typing import TYPE_CHECKING
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class CountedPaginator(Paginator):
+    """Paginator using a caller supplied object count
+
+    `count` may be an int or a callable returning one. This lets a view count
+    its objects with a cheaper query than `object_list.count()`, for example
+    counting rows in a through table instead of the joined queryset that is
+    actually paginated.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        orphans=0,
+        *,
+        count: int | Callable[[], int],
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, orphans, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self) -> int:
+        """Total number of objects, across all pages"""
+        return self._count() if callable(self._count) else self._count
+
+
+class LeanCountPaginator(Paginator):
+    """Paginator for QuerySets which counts only the matching primary keys
+
+    Gallery QuerySets carry ordering, annotations and select_related joins
+    which are only needed to display a page. Counting `values("pk")` without
+    ordering lets the database skip all of those for the COUNT query.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        """Total number of objects, across all pages"""
+        return self.object_list.order_by().values("pk").count()
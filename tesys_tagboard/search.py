@@ -14,7 +14,6 @@ from django.db.models import QuerySet
 from django.http import QueryDict
 from django.utils.safestring import SafeString
 from django.utils.translation import gettext_lazy as _
-from more_itertools import take
 
 from .enums import RatingLevel
 from .enums import SupportedMediaType
@@ -49,6 +48,9 @@ if TYPE_CHECKING:
 
 TAG_CATEGORY_DELIMITER = settings.TAG_CATEGORY_DELIMITER
 MAX_TAG_CATEGORY_DEPTH = settings.MAX_TAG_CATEGORY_DEPTH
+# Relation from a tag to its furthest rendered parent category, for
+# `select_related` so rendering a tag's category chain doesn't query each parent
+TAG_CATEGORY_CHAIN = "category" + "__parent" * MAX_TAG_CATEGORY_DEPTH
 VALID_ARG_RELATIONS = "".join([x.value for x in TokenArgRelation])
 SEARCH_ARG_QUOTE = settings.SEARCH_ARG_QUOTE
 SEARCH_ARG_QUOTE_PATTERN = re.compile(r"([" + SEARCH_ARG_QUOTE + r"])")
@@ -124,13 +126,19 @@ class UnevenArgumentQuotesError(ValidationError):
         super().__init__(msg, *args, **kwargs)
 
 
-def autocomplete_tags(
+def autocomplete_tags(  # noqa: PLR0913
     tags: QuerySet[Tag],
     include_partial: str | None = None,
     exclude_partial: str | None = None,
     exclude_tag_names: Iterable[str] | None = None,
     exclude_tags: QuerySet[Tag] | None = None,
+    limit: int | None = None,
 ) -> Iterable[AutocompleteItem]:
+    """Return autocomplete items for the `tags` matching `include_partial`
+
+    At most `limit` tags are fetched when it's provided
+    """
+    tags = tags.select_related(TAG_CATEGORY_CHAIN)
     if include_partial is not None:
         if named_token := NamedToken.from_token_string(include_partial):
             try:
@@ -146,6 +154,8 @@ def autocomplete_tags(
         tags = tags.exclude(name__in=exclude_tag_names)
     if exclude_tags is not None:
         tags = tags.exclude(pk__in=exclude_tags)
+    if limit is not None:
+        tags = tags[:limit]
 
     return (
         AutocompleteItem(
@@ -159,21 +169,29 @@ def autocomplete_tags(
     )
 
 
-def autocomplete_tag_aliases(
+def autocomplete_tag_aliases(  # noqa: PLR0913
     aliases: QuerySet[TagAlias],
     include_partial: str | None = None,
     exclude_partial: str | None = None,
     exclude_alias_names: Iterable[str] | None = None,
     exclude_aliases: QuerySet[TagAlias] | None = None,
+    limit: int | None = None,
 ) -> Generator[AutocompleteItem]:
+    """Return autocomplete items for the `aliases` matching `include_partial`
+
+    At most `limit` aliases are fetched when it's provided
+    """
+    aliases = aliases.select_related(f"tag__{TAG_CATEGORY_CHAIN}")
     if include_partial is not None:
-        aliases = TagAlias.aliases.filter(name__icontains=include_partial)
+        aliases = aliases.filter(name__icontains=include_partial)
     if exclude_partial is not None:
-        aliases = TagAlias.aliases.exclude(name__icontains=exclude_partial)
+        aliases = aliases.exclude(name__icontains=exclude_partial)
     if exclude_alias_names is not None:
         aliases = aliases.exclude(name__in=exclude_alias_names)
     if exclude_aliases is not None:
         aliases = aliases.exclude(pk__in=exclude_aliases)
+    if limit is not None:
+        aliases = aliases[:limit]
 
     return (
         AutocompleteItem(
@@ -519,16 +537,32 @@ class PostSearchTokenCategory(Enum):
 
         Raises: `SearchTokenNameError`
         """
-        for tc, name_and_aliases in [
-            (tc, [tc.value.name, *tc.value.aliases])
-            for tc in PostSearchTokenCategory.__members__.values()
-        ]:
-            if name in name_and_aliases:
-                return tc
+        if tc := _TOKEN_CATEGORIES_BY_NAME.get(name):
+            return tc
 
         raise SearchTokenNameError
 
 
+# The names and aliases of the search token categories never change, so collect
+# them once for autocompletion
+TOKEN_CATEGORY_NAMES = tuple(
+    (category, category.value.name) for category in PostSearchTokenCategory
+)
+TOKEN_CATEGORY_ALIASES = tuple(
+    (category, alias)
+    for category in PostSearchTokenCategory
+    for alias in category.value.aliases
+)
+
+# Token categories by name and alias for `PostSearchTokenCategory.select`. The first
+# category in definition order wins if a name is shared
+_TOKEN_CATEGORIES_BY_NAME: dict[str, PostSearchTokenCategory] = {}
+for _category in PostSearchTokenCategory:
+    for _name in (_category.value.name, *_category.value.aliases):
+        _TOKEN_CATEGORIES_BY_NAME.setdefault(_name, _category)
+del _category, _name
+
+
 class TagToken:
     """A search token identified as a tag token.
 
@@ -1007,6 +1041,7 @@ class PostSearch:
             search_conditions = [~Q(tags__in=self.exclude_tags)]
         else:
             search_conditions: list[Q] = []
+        required_tag_id_tokens = self.required_tag_id_tokens
         for token in self.tokens:
             match token.category:
                 case PostSearchTokenCategory.TAG:
@@ -1028,6 +1063,9 @@ class PostSearch:
                             )
 
                 case PostSearchTokenCategory.TAG_ID:
+                    if token in required_tag_id_tokens:
+                        # Applied together by `get_posts` via `has_tags`
+                        continue
                     match token.arg_relation:
                         case TokenArgRelation.EQUAL:
                             token_expr = Q(tags__pk=int(token.arg))
@@ -1287,9 +1325,22 @@ class PostSearch:
 
         return search_conditions
 
+    @property
+    def required_tag_id_tokens(self) -> list[NamedToken]:
+        """The non-negated `tag_id` tokens, i.e. the tags every result must have"""
+        return [
+            token
+            for token in self.tokens
+            if token.category is PostSearchTokenCategory.TAG_ID
+            and token.arg_relation is TokenArgRelation.EQUAL
+            and not token.negate
+        ]
+
     def get_posts(self) -> PostQuerySet:
         token_categories = [x.category for x in self.tokens]
-        posts = Post.posts.all()
+        posts = Post.posts.has_tags(
+            int(token.arg) for token in self.required_tag_id_tokens
+        )
         if PostSearchTokenCategory.COMMENT_COUNT in token_categories:
             posts = posts.annotate_comment_count()
         if PostSearchTokenCategory.FAV_COUNT in token_categories:
@@ -1340,46 +1391,34 @@ class PostSearch:
             ]
 
         if user:
-            tag_autocompletions = autocomplete_tags(
-                Tag.tags.for_user(user),
-                partial,
-                exclude_tag_names=tag_token_names,
-            )
-            tag_alias_autocompletions = autocomplete_tag_aliases(
-                TagAlias.aliases.for_user(user),
-                partial,
-                exclude_alias_names=tag_token_names,
-            )
+            tags = Tag.tags.for_user(user)
+            aliases = TagAlias.aliases.for_user(user)
         else:
-            tag_autocompletions = autocomplete_tags(
-                Tag.tags.all(),
-                partial,
-                exclude_tag_names=tag_token_names,
-            )
-
-            tag_alias_autocompletions = autocomplete_tag_aliases(
-                TagAlias.aliases.all(), partial, exclude_alias_names=tag_token_names
-            )
+            tags = Tag.tags.all()
+            aliases = TagAlias.aliases.all()
 
-        tag_autocompletions = take(self.max_tags, tag_autocompletions)
-        tag_alias_autocompletions = take(self.max_aliases, tag_alias_autocompletions)
+        # Only fetch as many tags and aliases as will be shown
+        tag_autocompletions = autocomplete_tags(
+            tags, partial, exclude_tag_names=tag_token_names, limit=self.max_tags
+        )
+        tag_alias_autocompletions = autocomplete_tag_aliases(
+            aliases,
+            partial,
+            exclude_alias_names=tag_token_names,
+            limit=self.max_aliases,
+        )
         autocomplete_items = chain(tag_autocompletions, tag_alias_autocompletions)
 
         matching_items_by_name = (
-            AutocompleteItem(category, category.value.name)
-            for category in PostSearchTokenCategory
-            if partial in category.value.name
+            AutocompleteItem(category, name)
+            for category, name in TOKEN_CATEGORY_NAMES
+            if partial in name
         )
 
-        matching_items_by_alias = chain(
-            *[
-                [
-                    AutocompleteItem(category, category.value.name, alias=alias)
-                    for alias in category.value.aliases
-                    if partial in alias
-                ]
-                for category in PostSearchTokenCategory
-            ]
+        matching_items_by_alias = (
+            AutocompleteItem(category, category.value.name, alias=alias)
+            for category, alias in TOKEN_CATEGORY_ALIASES
+            if partial in alias
         )
 
         if show_filters:
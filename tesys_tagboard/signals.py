@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+# Cache key of the categorized tags shown on the tags page without a search query
+TAGS_BY_CATEGORY_CACHE_KEY = "tags_by_category"
+
+# Cache key of the total number of posts shown on the home page
+POST_COUNT_CACHE_KEY = "post_count"
+
+
+def invalidate_tags_by_category(**kwargs):
+    """Clear the cached tags page listing when tags or categories change
+
+    The cache is cleared once the change is committed, otherwise a concurrent
+    request could cache the listing from before the change again
+    """
+    transaction.on_commit(
+        lambda: cache.delete(TAGS_BY_CATEGORY_CACHE_KEY), using=kwargs.get("using")
+    )
+
+
+for sender in ("tesys_tagboard.Tag", "tesys_tagboard.TagCategory"):
+    post_save.connect(
+        invalidate_tags_by_category,
+        sender=sender,
+        dispatch_uid=f"invalidate_tags_by_category_save_{sender}",
+    )
+    post_delete.connect(
+        invalidate_tags_by_category,
+        sender=sender,
+        dispatch_uid=f"invalidate_tags_by_category_delete_{sender}",
+    )
+
+
+def invalidate_post_count(**kwargs):
+    """Clear the cached post count when posts are created or deleted
+
+    The cache is cleared once the change is committed, otherwise a concurrent
+    request could cache the count from before the change again
+    """
+    if kwargs.get("created", True):
+        transaction.on_commit(
+            lambda: cache.delete(POST_COUNT_CACHE_KEY), using=kwargs.get("using")
+        )
+
+
+post_save.connect(
+    invalidate_post_count,
+    sender="tesys_tagboard.Post",
+    dispatch_uid="invalidate_post_count_save",
+)
+post_delete.connect(
+    invalidate_post_count,
+    sender="tesys_tagboard.Post",
+    dispatch_uid="invalidate_post_count_delete",
+)
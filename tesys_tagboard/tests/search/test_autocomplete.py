@@ -25,6 +25,10 @@ class TestTagAutocomplete:
         assert "sky-blue" in tag_names
         assert len(tag_names) == 6
 
+    def test_autocomplete_limit(self, db):
+        tags = list(autocomplete_tags(Tag.tags.all(), "blue", limit=2))
+        assert len(tags) == 2
+
     def test_autocomplete_partial_with_category(self, db):
         tags = list(autocomplete_tags(Tag.tags.all(), "Peru:"))
         tag_names = [tag.name for tag in tags]
@@ -87,6 +91,13 @@ class TestTagAliasAutocomplete:
         assert "red_x_blue" in alias_names
         assert len(alias_names) == 6
 
+    def test_autocomplete_limits_given_aliases(self, db):
+        aliases = autocomplete_tag_aliases(
+            TagAlias.aliases.filter(name="bluejeans"), "blue"
+        )
+        alias_names = [alias.alias for alias in aliases]
+        assert alias_names == ["bluejeans"]
+
     def test_autocomplete_excluded_by_name_partial(self, db):
         aliases = autocomplete_tag_aliases(
             TagAlias.aliases.all(), exclude_partial="red"
@@ -296,6 +296,36 @@ class TestTagID:
         assert len(posts) == 1
         assert posts[0].pk == post.pk
 
+    def test_multiple_ids_require_all_tags(self):
+        tag1, tag2 = TagFactory.create_batch(2)
+        post_with_both = PostFactory.create()
+        post_with_both.tags.set([tag1, tag2])
+        post_with_one = PostFactory.create()
+        post_with_one.tags.set([tag1])
+
+        posts = PostSearch(f"tag_id={tag1.pk} tag_id={tag2.pk}").get_posts()
+        assert list(posts) == [post_with_both]
+
+    def test_negated_id(self):
+        tag1, tag2 = TagFactory.create_batch(2)
+        included_post = PostFactory.create()
+        included_post.tags.set([tag1])
+        excluded_post = PostFactory.create()
+        excluded_post.tags.set([tag1, tag2])
+
+        posts = PostSearch(f"tag_id={tag1.pk} -tag_id={tag2.pk}").get_posts()
+        assert list(posts) == [included_post]
+
+    def test_multiple_ids_keep_comment_count(self):
+        """Matching several tags shouldn't multiply other counted relations"""
+        tag1, tag2 = TagFactory.create_batch(2)
+        post = PostFactory.create()
+        post.tags.set([tag1, tag2])
+        CommentFactory.create_batch(2, post=post)
+
+        query = f"tag_id={tag1.pk} tag_id={tag2.pk} comment_count=2"
+        assert list(PostSearch(query).get_posts()) == [post]
+
 
 @pytest.mark.django_db
 class TestTagAliases:
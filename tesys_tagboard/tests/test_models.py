@@ -1,7 +1,13 @@
+import hashlib
+
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
 
+from tesys_tagboard.models import Post
 from tesys_tagboard.models import Tag
+from tesys_tagboard.models import file_md5
 
+from .factories import PostFactory
 from .factories import TagFactory
 
 
@@ -68,3 +74,38 @@ class TestLikeLookup:
         assert tag2 in tags
         assert tag3 not in tags
         assert tag4 not in tags
+
+
+@pytest.mark.django_db
+class TestPostHasTags:
+    def test_has_all_tags(self):
+        tag1, tag2 = TagFactory.create_batch(2)
+        post_with_both = PostFactory.create()
+        post_with_both.tags.set([tag1, tag2])
+        post_with_one = PostFactory.create()
+        post_with_one.tags.set([tag1])
+
+        posts = Post.posts.has_tags([tag1, tag2])
+        assert post_with_both in posts
+        assert post_with_one not in posts
+
+    def test_has_single_tag(self):
+        tag = TagFactory.create()
+        post = PostFactory.create()
+        post.tags.set([tag])
+
+        assert list(Post.posts.has_tags([tag])) == [post]
+
+    def test_has_tag_ids(self):
+        tag1, tag2 = TagFactory.create_batch(2)
+        post = PostFactory.create()
+        post.tags.set([tag1, tag2])
+
+        assert list(Post.posts.has_tags([tag1.pk, tag2.pk])) == [post]
+
+
+class TestFileMd5:
+    def test_matches_md5_of_contents(self):
+        contents = b"tagboard" * 10000
+        file = SimpleUploadedFile("test.bin", contents)
+        assert file_md5(file) == hashlib.md5(contents).hexdigest()  # noqa: S324
@@ -0,0 +1,34 @@
+import pytest
+
+from tesys_tagboard.models import Post
+from tesys_tagboard.pagination import CountedPaginator
+from tesys_tagboard.pagination import LeanCountPaginator
+
+from .factories import PostFactory
+
+
+class TestCountedPaginator:
+    def test_uses_given_count(self):
+        pager = CountedPaginator(range(100), 10, count=42)
+        assert pager.count == 42
+        assert pager.num_pages == 5
+
+    def test_count_callable_is_called_once(self):
+        calls = []
+
+        def count():
+            calls.append(None)
+            return 25
+
+        pager = CountedPaginator(range(25), 10, count=count)
+        assert pager.count == 25
+        assert len(calls) == 1
+
+
+@pytest.mark.django_db
+class TestLeanCountPaginator:
+    def test_count_matches_queryset(self, user):
+        PostFactory.create_batch(7)
+        posts = Post.posts.with_gallery_data(user)
+        pager = LeanCountPaginator(posts, 3)
+        assert pager.count == posts.count()
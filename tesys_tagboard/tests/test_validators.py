@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 
 from tesys_tagboard.validators import tag_name_validator
 from tesys_tagboard.validators import tagset_validator
+from tesys_tagboard.validators import wildcard_url_validator
 
 
 class TestTagSet:
@@ -38,3 +39,24 @@ class TestTagName:
     def test_name_has_asterisks(self):
         with pytest.raises(ValidationError):
             tag_name_validator("*category*tag*")
+
+
+class TestWildcardUrl:
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://test1.example.com",
+            "test.example.",
+            "http://example.com/path?q=1&r=[2]#frag",
+        ],
+    )
+    def test_valid(self, url):
+        wildcard_url_validator(url)
+
+    @pytest.mark.parametrize(
+        "url",
+        ["https://example.com/<script>", 'example.com/"path"', "example.com\n"],
+    )
+    def test_invalid_characters(self, url):
+        with pytest.raises(ValidationError):
+            wildcard_url_validator(url)
@@ -1,11 +1,12 @@
 from http import HTTPStatus
+from itertools import chain
 from mimetypes import types_map
 from pathlib import Path
 
 import pytest
-from django.contrib.auth.models import Permission
 from django.core.files.storage import storages
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.loader import get_template
 from django.urls import reverse
 from pytest_django.asserts import assertTemplateUsed
 
@@ -25,6 +26,7 @@ from .factories import CommentFactory
 from .factories import FavoriteFactory
 from .factories import PostFactory
 from .factories import TagAliasFactory
+from .factories import TagCategoryFactory
 from .factories import TagFactory
 
 # NOTE: most fixtures are defined in conftest.py
@@ -34,27 +36,59 @@ from .factories import TagFactory
 class TestHomeView:
     url = reverse("home")
 
-    def test_home(self, client):
-        response = client.get(self.url)
+    def test_home(self, ro_client):
+        response = ro_client.get(self.url)
         assert response.status_code == HTTPStatus.OK
         assertTemplateUsed(response, "pages/home.html")
 
-    def test_max_query_count(self, client):
-        client.get(self.url)
+    def test_post_count_updates(self, ro_client, django_capture_on_commit_callbacks):
+        count = ro_client.get(self.url).context["post_count"]
+        with django_capture_on_commit_callbacks(execute=True):
+            PostFactory.create()
+        assert ro_client.get(self.url).context["post_count"] == count + 1
+
+    def test_post_count_kept_until_commit(
+        self, ro_client, django_capture_on_commit_callbacks
+    ):
+        """The cached count is only cleared once the new post is committed"""
+        count = ro_client.get(self.url).context["post_count"]
+        with django_capture_on_commit_callbacks() as callbacks:
+            PostFactory.create()
+            assert ro_client.get(self.url).context["post_count"] == count
+        assert len(callbacks) == 1
+
+    def test_max_query_count(self, ro_client):
+        ro_client.get(self.url)
 
 
 @pytest.mark.django_db
 class TestTagsView:
     url = reverse("tags")
 
-    def test_tags(self, client):
-        response = client.get(self.url)
+    def test_tags(self, ro_client):
+        response = ro_client.get(self.url)
         assertTemplateUsed(response, "pages/tags.html")
         assert response.status_code == HTTPStatus.OK
 
-    def test_max_query_count(self, client, django_assert_max_num_queries):
+    def test_new_tag_clears_cached_tags(
+        self, ro_client, django_capture_on_commit_callbacks
+    ):
+        ro_client.get(self.url)
+        with django_capture_on_commit_callbacks(execute=True):
+            tag = TagFactory.create(category=TagCategoryFactory.create())
+        response = ro_client.get(self.url)
+        tags = chain.from_iterable(response.context["tags_by_cat"].values())
+        assert tag in tags
+
+    def test_filter_uncategorized_tags(self, ro_client):
+        tag = TagFactory.create(name="uncategorized_test_tag")
+        response = ro_client.get(self.url, {"q": "uncategorized_test"})
+        assert response.context["uncategorized_tags"] == [tag]
+        assert tag not in chain.from_iterable(response.context["tags_by_cat"].values())
+
+    def test_max_query_count(self, ro_client, django_assert_max_num_queries):
         with django_assert_max_num_queries(30):
-            client.get(self.url)
+            ro_client.get(self.url)
 
 
 @pytest.mark.django_db(transaction=True)
@@ -239,6 +273,16 @@ class TestCommenting:
         assert response.status_code == HTTPStatus.OK
         assert post.comment_set.filter(text=text).exists()
 
+    def test_add_comment_renders_first_page(self, client, user_with_add_comment):
+        """Only the first page of comments is rendered after adding a comment"""
+        post = PostFactory.create()
+        CommentFactory.create_batch(15, post=post)
+        client.force_login(user_with_add_comment)
+        url = self.add_comment_url(post.pk)
+        response = client.post(url, {"text": "testing comment"})
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.context["comments"]) == 10
+
     def test_add_comment_with_locked_comments(self, client, user_with_add_comment):
         """Comments cannot be added to a post while it's comments are locked"""
         post = PostFactory.create(locked_comments=True)
@@ -397,6 +441,13 @@ class TestPostView:
         response = client.get(url)
         assert response.status_code == HTTPStatus.OK
 
+    def test_view_post_neighbors(self, client):
+        """The previous and next posts are the neighbors by post date"""
+        first, middle, last = PostFactory.create_batch(3)
+        response = client.get(self.view_url(middle.pk))
+        assert response.context["previous_post"]["pk"] == first.pk
+        assert response.context["next_post"]["pk"] == last.pk
+
     def test_delete_post_without_perm(self, client):
         """Users without the `delete_post` permission may not delete posts"""
         post = PostFactory.create()
@@ -541,12 +592,7 @@ class TestPostView:
     @pytest.mark.parametrize("initial", [True, False])
     def test_lock_unlock_comments_with_perm(self, client, initial):
         post = PostFactory.create(locked_comments=initial)
-        user = UserFactory().with_permissions(
-            [
-                Permission.objects.get(codename="change_post"),
-                Permission.objects.get(codename="lock_comments"),
-            ]
-        )
+        user = UserFactory.create_with_perms("change_post", "lock_comments")
         client.force_login(user)
         url = self.lock_comments_url(post.pk)
 
@@ -572,14 +618,14 @@ class TestPostView:
 class TestPostsView:
     url = reverse("posts")
 
-    def test_posts(self, client):
-        response = client.get(self.url)
+    def test_posts(self, ro_client):
+        response = ro_client.get(self.url)
         assert response.status_code == HTTPStatus.OK
         assertTemplateUsed(response, "pages/posts.html")
 
-    def test_max_query_count(self, client, django_assert_max_num_queries):
+    def test_max_query_count(self, ro_client, django_assert_max_num_queries):
         with django_assert_max_num_queries(20):
-            client.get(self.url)
+            ro_client.get(self.url)
 
     def test_max_logged_in_query_count(self, client, django_assert_max_num_queries):
         user = User.objects.get(username="user1")
@@ -587,14 +633,41 @@ class TestPostsView:
         with django_assert_max_num_queries(25):
             client.get(self.url)
 
+    def test_anonymous_post_count_updates(
+        self, ro_client, django_capture_on_commit_callbacks
+    ):
+        """The cached post count used for anonymous visitors follows new posts"""
+        count = ro_client.get(self.url).context["pager"].count
+        assert count == Post.posts.count()
+        with django_capture_on_commit_callbacks(execute=True):
+            PostFactory.create()
+        assert ro_client.get(self.url).context["pager"].count == count + 1
+
+    def test_anonymous_post_count_after_upload(
+        self, client, ro_client, user_with_add_post, django_capture_on_commit_callbacks
+    ):
+        """Uploads are committed in a transaction, the anonymous gallery count is
+        only refreshed once that transaction commits"""
+        count = ro_client.get(self.url).context["pager"].count
+        client.force_login(user_with_add_post)
+        with django_capture_on_commit_callbacks() as callbacks:
+            img_file = get_uploaded_test_media_file("1x1", "png")
+            response = client.post(reverse("upload"), {"file": img_file})
+            assert response.status_code == HTTPStatus.OK
+            assert ro_client.get(self.url).context["pager"].count == count
+
+        for callback in callbacks:
+            callback()
+        assert ro_client.get(self.url).context["pager"].count == count + 1
+
 
 @pytest.mark.django_db
 class TestPostsAutocomplete:
     url = reverse("autocomplete")
 
-    def test_autocomplete_as_anonymous_user(self, client):
+    def test_autocomplete_as_anonymous_user(self, ro_client):
         data = {"query": "blu"}
-        response = client.get(self.url, data)
+        response = ro_client.get(self.url, data)
         assert response.status_code == HTTPStatus.OK
 
     def test_autocomplete_as_known_user(self, client):
@@ -638,9 +711,9 @@ class TestUploadView:
         assert response.status_code == HTTPStatus.OK
         assertTemplateUsed(response, "account/login.html")
 
-    def test_max_query_count(self, client, django_assert_max_num_queries):
+    def test_max_query_count(self, ro_client, django_assert_max_num_queries):
         with django_assert_max_num_queries(20):
-            client.get(self.url)
+            ro_client.get(self.url)
 
     def test_user_without_add_post_perm(self, client):
         """User's without the 'add_post' permission cannot make posts"""
@@ -692,6 +765,20 @@ class TestUploadView:
 
         assert after_posts == before_posts + 1
 
+    def test_create_post_ignores_client_content_type(self, client, user_with_add_post):
+        """The content type is detected from the file instead of the request"""
+        client.force_login(user_with_add_post)
+
+        img_file = get_uploaded_test_media_file("1x1", "png")
+        img_file.content_type = "application/octet-stream"
+        title_text = "Sniffed content type"
+        data = {"title": title_text, "file": img_file}
+
+        response = client.post(self.url, data)
+        assert response.status_code == HTTPStatus.OK
+        post = Post.posts.get(title=title_text)
+        assert post.image.mimetype == "image/png"
+
     def test_create_jpg_img_post(self, client, user_with_add_post):
         client.force_login(user_with_add_post)
 
@@ -951,6 +1038,18 @@ class TestFavorites:
                 post=post, user=user_with_add_favorite
             ).exists()
 
+    def test_add_favorite_twice(self, client, user_with_add_favorite):
+        """Favoriting an already favorited post should keep the single favorite"""
+        client.force_login(user_with_add_favorite)
+        post = PostFactory.create()
+        client.put(self.add_url(post.pk))
+        response = client.put(self.add_url(post.pk))
+        assert response.status_code == HTTPStatus.OK
+        assert (
+            Favorite.favorites.filter(post=post, user=user_with_add_favorite).count()
+            == 1
+        )
+
     def test_add_favorite_with_invalid_post_id(self, client, user_with_add_favorite):
         """Requests to add a favorite with a non-existant Post should return an error"""
         client.force_login(user_with_add_favorite)
@@ -991,14 +1090,14 @@ class TestCollections:
     def delete_url(self, collection_id: int):
         return reverse("delete-collection", args=[collection_id])
 
-    def test_collections(self, client):
-        response = client.get(self.view_url)
+    def test_collections(self, ro_client):
+        response = ro_client.get(self.view_url)
         assert response.status_code == HTTPStatus.OK
         assertTemplateUsed(response, "pages/collections.html")
 
-    def test_max_query_count(self, client, django_assert_max_num_queries):
+    def test_max_query_count(self, ro_client, django_assert_max_num_queries):
         with django_assert_max_num_queries(20):
-            client.get(self.view_url)
+            ro_client.get(self.view_url)
 
     def test_create_collection_without_perm(self, client):
         """Users without the add_collection permission may not create
@@ -1099,9 +1198,7 @@ class TestCollections:
 
     def test_add_post_to_collection(self, client):
         """Users may add posts to their own collections"""
-        user = UserFactory.create().with_permissions(
-            [Permission.objects.get(codename="add_post_to_collection")]
-        )
+        user = UserFactory.create_with_perms("add_post_to_collection")
         post = PostFactory.create()
         collection = CollectionFactory.create(user=user)
         url = reverse("collection-add-post", args=[collection.pk])
@@ -1111,6 +1208,27 @@ class TestCollections:
         assert resp.status_code == HTTPStatus.OK
         assert collection.posts.filter(pk=post.pk).exists()
 
+    def test_add_missing_post_to_collection(self, client):
+        """Adding a post that doesn't exist returns a 404 instead of an error"""
+        user = UserFactory.create_with_perms("add_post_to_collection")
+        collection = CollectionFactory.create(user=user)
+        url = reverse("collection-add-post", args=[collection.pk])
+
+        client.force_login(user)
+        resp = client.post(url, {"post": 0})
+        assert resp.status_code == HTTPStatus.NOT_FOUND
+        assert not collection.posts.exists()
+
+    def test_add_post_to_missing_collection(self, client):
+        """Adding a post to a collection that doesn't exist returns a 404"""
+        user = UserFactory.create_with_perms("add_post_to_collection")
+        post = PostFactory.create()
+        url = reverse("collection-add-post", args=[0])
+
+        client.force_login(user)
+        resp = client.post(url, {"post": post.pk})
+        assert resp.status_code == HTTPStatus.NOT_FOUND
+
     def test_add_post_to_collection_without_perm(self, client):
         """Users may add posts to their own collections"""
         user = UserFactory.create()
@@ -1125,9 +1243,7 @@ class TestCollections:
 
     def test_remove_post_from_collection(self, client):
         """Users may remove posts from their own collections"""
-        user = UserFactory.create().with_permissions(
-            [Permission.objects.get(codename="remove_post_from_collection")]
-        )
+        user = UserFactory.create_with_perms("remove_post_from_collection")
         posts = PostFactory.create_batch(10)
         collection = CollectionFactory.create(user=user)
         collection.posts.set(posts)
@@ -1160,16 +1276,38 @@ class TestCollections:
         for post in posts[1:]:
             assert collection.posts.filter(pk=post.pk).exists()
 
+    def test_collection_shows_only_its_posts(self, client):
+        user = UserFactory.create()
+        posts = PostFactory.create_batch(3)
+        PostFactory.create_batch(2)
+        collection = CollectionFactory.create(user=user, posts=posts)
+
+        client.force_login(user)
+        resp = client.get(reverse("collection", args=[collection.pk]))
+        assert resp.status_code == HTTPStatus.OK
+        page_post_ids = {post.pk for post in resp.context["page"]}
+        assert page_post_ids == {post.pk for post in posts}
+
 
 @pytest.mark.django_db
 class TestHelpView:
     url = reverse("help")
 
-    def test_help(self, client):
-        response = client.get(self.url)
+    def test_help(self, ro_client):
+        response = ro_client.get(self.url)
         assert response.status_code == HTTPStatus.OK
         assertTemplateUsed(response, "pages/help.html")
 
-    def test_max_query_count(self, client, django_assert_max_num_queries):
+    def test_max_query_count(self, ro_client, django_assert_max_num_queries):
         with django_assert_max_num_queries(20):
-            client.get(self.url)
+            ro_client.get(self.url)
+
+
+class TestTemplateCaching:
+    def test_templates_are_compiled_once(self):
+        """Views render the same templates and htmx partials on every request, so
+        they should only be compiled once by the cached template loader"""
+        template_name = "pages/tags.html"
+        assert (
+            get_template(template_name).template is get_template(template_name).template
+        )
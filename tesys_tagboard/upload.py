@@ -3,16 +3,26 @@ from typing import TYPE_CHECKING
 import magic
 
 if TYPE_CHECKING:
-    from pathlib import Path
-
+    from django.core.files import File
     from django.core.files.uploadedfile import UploadedFile
 
+# libmagic only needs the file signature at the start of a file to detect its type
+MAGIC_BUFFER_SIZE = 2048
+
+
+def sniff_content_type(file: File) -> str:
+    """Detect the MIME type of `file` from its leading bytes
 
-def get_file_content_type(file: Path):
-    return magic.from_buffer(file.open("rb").read(2048), mime=True)
+    The file is rewound afterwards so it can still be read from the start
+    """
+    file.seek(0)
+    content_type = magic.from_buffer(file.read(MAGIC_BUFFER_SIZE), mime=True)
+    file.seek(0)
+    return content_type
 
 
 def fix_upload_content_type(file: UploadedFile):
-    # Correct content-type based on file signature if necessary
-    file.content_type = magic.from_buffer(file.open("rb").read(2048), mime=True)
+    # Correct content-type based on file signature if necessary. The client
+    # provided content type can't be trusted and may be missing entirely
+    file.content_type = sniff_content_type(file.open("rb"))
     return file
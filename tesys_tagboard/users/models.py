@@ -49,7 +49,6 @@ class User(AbstractUser):
 
     def with_permissions(self, perms: list[Permission]) -> User:
         self.user_permissions.add(*perms)
-        self.save()
         return self
 
     def add_to_group(self, group_name: str) -> User:
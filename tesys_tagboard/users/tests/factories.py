@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 from typing import Any
 
+from django.contrib.auth.models import Permission
 from factory import Faker
 from factory import post_generation
 from factory.django import DjangoModelFactory
@@ -39,6 +40,25 @@ class UserFactory(DjangoModelFactory[User]):
             # Some post-generation hooks ran, and may have modified us.
             instance.save()
 
+    @classmethod
+    def create_with_perms(cls, *codenames: str) -> User:
+        """Create a user with the permissions named by `codenames`
+
+        The user is saved with a single INSERT and the permissions are added
+        with a single bulk INSERT into the through table, skipping the extra
+        save and lookups of `create()` followed by `User.with_permissions`.
+        """
+        user = cls.build()
+        user.save()
+        perm_ids = Permission.objects.filter(codename__in=codenames).values_list(
+            "pk", flat=True
+        )
+        through = User.user_permissions.through
+        through.objects.bulk_create(
+            [through(user_id=user.pk, permission_id=perm_id) for perm_id in perm_ids]
+        )
+        return user
+
     class Meta:
         model = User
         django_get_or_create = ["username"]
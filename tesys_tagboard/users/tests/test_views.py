@@ -7,18 +7,25 @@ from django.contrib import messages
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.messages.middleware import MessageMiddleware
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connection
 from django.http import HttpRequest
 from django.http import HttpResponseRedirect
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from tesys_tagboard.tests.factories import CollectionFactory
+from tesys_tagboard.tests.factories import FavoriteFactory
+from tesys_tagboard.tests.factories import PostFactory
 from tesys_tagboard.users.forms import UserAdminChangeForm
 from tesys_tagboard.users.tests.factories import UserFactory
 from tesys_tagboard.users.views import UserRedirectView
 from tesys_tagboard.users.views import UserUpdateView
+from tesys_tagboard.users.views import user_detail_url
 from tesys_tagboard.users.views import user_detail_view
 
 if TYPE_CHECKING:
+    from django.test import Client
     from django.test import RequestFactory
 
     from tesys_tagboard.users.models import User
@@ -86,6 +93,13 @@ class TestUserRedirectView:
         assert view.get_redirect_url() == f"/users/{user.username}/"
 
 
+class TestUserDetailUrl:
+    @pytest.mark.parametrize("username", ["alice", "bob.smith", "a+b@c-d_e", "zoë"])
+    def test_matches_reverse(self, username: str):
+        expected = reverse("users:detail", kwargs={"username": username})
+        assert user_detail_url(username) == expected
+
+
 class TestUserDetailView:
     def test_authenticated(self, user: User, rf: RequestFactory):
         request = rf.get("/fake-url/")
@@ -103,3 +117,51 @@ class TestUserDetailView:
         assert isinstance(response, HttpResponseRedirect)
         assert response.status_code == HTTPStatus.FOUND
         assert response.url == f"{login_url}?next=/fake-url/"
+
+    def test_settings_post_without_settings(self, user: User, client: Client):
+        client.force_login(user)
+        url = reverse("users:detail", kwargs={"username": user.username})
+        response = client.post(url, {"unrelated": "value"})
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_favorites_query_count_is_independent_of_total(
+        self, user: User, client: Client
+    ):
+        """Only the requested page of favorites should be loaded"""
+        client.force_login(user)
+        url = reverse("users:detail", kwargs={"username": user.username})
+
+        def count_queries() -> int:
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url, {"tab": "favorites"})
+            assert response.status_code == HTTPStatus.OK
+            return len(ctx.captured_queries)
+
+        FavoriteFactory.create_batch(30, user=user)
+        num_queries = count_queries()
+
+        FavoriteFactory.create_batch(60, user=user)
+        assert count_queries() == num_queries
+
+    def test_other_users_collections_query_count_is_independent_of_total(
+        self, user: User, client: Client
+    ):
+        """Other users' public collections are listed without a query per
+        collection"""
+        other_user = UserFactory()
+        client.force_login(user)
+        url = reverse("users:detail", kwargs={"username": other_user.username})
+
+        def count_queries() -> int:
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url, {"tab": "collections"})
+            assert response.status_code == HTTPStatus.OK
+            return len(ctx.captured_queries)
+
+        posts = PostFactory.create_batch(3)
+        CollectionFactory.create_batch(2, user=other_user, public=True, posts=posts)
+        num_queries = count_queries()
+
+        CollectionFactory.create_batch(8, user=other_user, public=True, posts=posts)
+        assert count_queries() == num_queries
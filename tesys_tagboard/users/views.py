@@ -1,8 +1,12 @@
+import functools
 from typing import TYPE_CHECKING
+from urllib.parse import quote
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.core.paginator import Paginator
+from django.db.models import BooleanField
+from django.db.models import Prefetch
+from django.db.models import Value
 from django.http import HttpRequest
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
@@ -11,15 +15,18 @@ from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
 from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import RedirectView
 from django.views.generic import UpdateView
 
 from tesys_tagboard.decorators import require
-from tesys_tagboard.enums import RatingLevel
+from tesys_tagboard.enums import RATING_LEVELS
 from tesys_tagboard.forms import EditUserSettingsForm
 from tesys_tagboard.models import Collection
+from tesys_tagboard.models import Post
 from tesys_tagboard.models import Tag
+from tesys_tagboard.pagination import CountedPaginator
 
 from .models import User
 
@@ -34,10 +41,86 @@ class HtmxHttpRequest(HttpRequest):
     htmx: HtmxDetails
 
 
+_USERNAME_PLACEHOLDER = "__username__"
+_USER_SETTINGS_FIELDS = frozenset(EditUserSettingsForm.base_fields)
+
+
+@functools.lru_cache(maxsize=1)
+def _user_detail_url_template() -> str:
+    return reverse("users:detail", kwargs={"username": _USERNAME_PLACEHOLDER})
+
+
+def user_detail_url(username: str) -> str:
+    """Return the URL of a user's detail page
+
+    The URL pattern is only reversed once and then reused for every username,
+    quoting the username the same way `reverse` would.
+    """
+    return _user_detail_url_template().replace(
+        _USERNAME_PLACEHOLDER, quote(username, safe=RFC3986_SUBDELIMS + "~:@")
+    )
+
+
 @require(["GET", "POST"], login=True)
 def user_detail_view(
     request: HtmxHttpRequest, username: str
 ) -> TemplateResponse | HttpResponse:
+    if request.method == "POST":
+        # Users may only edit their own settings, so the logged in user is
+        # the one to update and there's no need to look it up
+        if request.user.username != username:
+            return HttpResponseForbidden()
+        user = request.user
+
+        if request.POST.keys().isdisjoint(_USER_SETTINGS_FIELDS):
+            return HttpResponseBadRequest("Invalid form data")
+
+        # Only copy the fields the form uses out of the POST data
+        data: dict[str, str | list[Any] | None] = {
+            "blur_rating_level": request.POST.get("blur_rating_level"),
+            "filter_tags": (
+                request.POST.getlist("filter_tags")
+                if "filter_tags" in request.POST
+                else None
+            ),
+            "blur_tags": (
+                request.POST.getlist("blur_tags")
+                if "blur_tags" in request.POST
+                else None
+            ),
+        }
+
+        form = EditUserSettingsForm(data)
+        if not form.is_valid():
+            return HttpResponseBadRequest("Invalid form data")
+
+        user.blur_rating_level = form.cleaned_data.get("blur_rating_level")
+        user.save(update_fields=["blur_rating_level"])
+
+        # Setting the M2M relations writes the through tables directly and
+        # doesn't need another save of the user
+        filter_tagset = form.cleaned_data.get("filter_tags") or set()
+        blur_tagset = form.cleaned_data.get("blur_tags") or set()
+        if filter_tagset or blur_tagset:
+            # Resolve both tagsets with a single query. Only the IDs of the
+            # existing tags are needed for set() to diff against the current
+            # relations, so don't load the full tags
+            tag_ids = set(
+                Tag.tags.in_tagset(filter_tagset | blur_tagset).values_list(
+                    "pk", flat=True
+                )
+            )
+            if filter_tagset:
+                user.filter_tags.set(tag_ids & filter_tagset)
+            if blur_tagset:
+                user.blur_tags.set(tag_ids & blur_tagset)
+
+        if request.htmx:
+            return TemplateResponse(request, "users/user_detail.html#user-settings")
+
+        return redirect(user_detail_url(user.username))
+
+    # GET request
     user = get_object_or_404(User, username=username)
     context = {
         "user": user,
@@ -46,11 +129,17 @@ def user_detail_view(
     if request.user == user and user.is_authenticated:
         # This user's page
         collections = user.collection_set.with_gallery_data()
-        favorited_posts = [f.post for f in user.favorite_set.with_gallery_data()]
-        for post in favorited_posts:
-            post.favorited = True
+        favorited_posts = (
+            Post.posts.filter(favorite__user=user)
+            .annotate(favorited=Value(value=True, output_field=BooleanField()))
+            .select_related("image", "audio", "video")
+            .prefetch_related(Prefetch("tags", queryset=Tag.tags.with_gallery_data()))
+        )
 
-        favorites_pager = Paginator(favorited_posts, 24, 4)
+        # Count the favorites table directly rather than the posts JOIN
+        favorites_pager = CountedPaginator(
+            favorited_posts, 24, 4, count=user.favorite_set.count
+        )
         fav_page_arg_name = "fav_page"
         favorites_page_num = request.GET.get(fav_page_arg_name, 1)
         favorites_page = favorites_pager.get_page(favorites_page_num)
@@ -59,54 +148,21 @@ def user_detail_view(
             "favorites_page": favorites_page,
             "favorites_page_arg_name": fav_page_arg_name,
             "collections": collections,
-            "blur_rating_levels": list(RatingLevel),
-            "filter_tags": user.filter_tags.all(),
-            "blur_tags": user.blur_tags.all(),
+            "blur_rating_levels": RATING_LEVELS,
+            "filter_tags": user.filter_tags.select_related("category"),
+            "blur_tags": user.blur_tags.select_related("category"),
         }
     else:
         # Other users' pages
-        public_collections = Collection.objects.filter(user=user, public=True)
+        # The collection thumbnails count their posts, so prefetch the post IDs
+        # rather than counting each collection separately
+        public_collections = (
+            Collection.objects.for_user(user).public().with_gallery_data()
+        )
         context |= {
             "collections": public_collections,
         }
 
-    if request.method == "POST":
-        if user != request.user:
-            return HttpResponseForbidden()
-
-        data: dict[str, str | list[Any] | None] = {
-            key: request.POST.get(key) for key in request.POST
-        }
-        data["filter_tags"] = (
-            request.POST.getlist("filter_tags")
-            if "filter_tags" in request.POST
-            else None
-        )
-        data["blur_tags"] = (
-            request.POST.getlist("blur_tags", None)
-            if "blur_tags" in request.POST
-            else None
-        )
-
-        form = EditUserSettingsForm(data)
-        if form.is_valid():
-            user.blur_rating_level = form.cleaned_data.get("blur_rating_level")
-
-            if filter_tagset := form.cleaned_data.get("filter_tags"):
-                user.filter_tags.set(Tag.tags.in_tagset(filter_tagset))
-
-            if blur_tagset := form.cleaned_data.get("blur_tags"):
-                user.blur_tags.set(Tag.tags.in_tagset(blur_tagset))
-
-            user.save()
-        else:
-            return HttpResponseBadRequest("Invalid form data")
-
-        if request.htmx:
-            return TemplateResponse(request, "users/user_detail.html#user-settings")
-
-        return redirect(reverse("users:detail", args=[user.username]), context)
-
     return TemplateResponse(request, "users/user_detail.html", context)
 
 
@@ -131,7 +187,7 @@ class UserRedirectView(LoginRequiredMixin, RedirectView):
     permanent = False
 
     def get_redirect_url(self) -> str:
-        return reverse("users:detail", kwargs={"username": self.request.user.username})
+        return user_detail_url(self.request.user.username)
 
 
 user_redirect_view = UserRedirectView.as_view()
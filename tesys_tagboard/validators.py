@@ -11,10 +11,11 @@ from .enums import RatingLevel
 from .enums import SupportedMediaType
 from .upload import fix_upload_content_type
 
-rgb_validator = validators.RegexValidator(r"^#[0-9A-F]{6}$")
+rgb_validator = validators.RegexValidator(_lazy_re_compile(r"^#[0-9A-F]{6}$"))
 md5_validator = validators.RegexValidator(r"^[0-9A-Z]{32}$")
 phash_validator = validators.RegexValidator(r"^[0-9a-z]{16}$")
-dhash_validator = validators.RegexValidator(r"^[0-9a-z]{16}$")
+# Both image hashes share a format, so share a validator
+dhash_validator = phash_validator
 tag_name_validator = validators.RegexValidator(
     _lazy_re_compile(r"^[a-zA-Z\d\:-_]+$"), message=_("Enter a valid tag name.")
 )
@@ -23,7 +24,7 @@ tag_token_validator = validators.RegexValidator(
     _lazy_re_compile(r"^[a-zA-Z\d\:-_" + settings.TAG_CATEGORY_DELIMITER + "]+$"),
     message=_("Enter a valid tag token."),
 )
-tagset_name_validator = validators.RegexValidator(r"^[a-z\d\-_]+$")
+tagset_name_validator = validators.RegexValidator(_lazy_re_compile(r"^[a-z\d\-_]+$"))
 username_validator = validators.RegexValidator(
     _lazy_re_compile(r"^[a-zA-Z\d_\-]+\Z"),
     message=_("Enter a valid username."),
@@ -35,7 +36,7 @@ positive_int_validator = validators.RegexValidator(
 wildcard_url_validator = validators.RegexValidator(
     # For allowing URLs with wildcards and without requiring
     # a protocol specifier or other URL validation
-    r"[ A-Za-z0-9-.,_~:\/#@!$&';%=\*\+\(\)\?\[\]]",
+    _lazy_re_compile(r"\A[ A-Za-z0-9\-.,_~:/#@!$&';%=*+()?\[\]]+\Z"),
     message=_("Enter a valid URL with wildcards"),
 )
 iso_date_validator = validators.RegexValidator(
@@ -62,8 +63,8 @@ wildcard_collection_name_validator = validators.RegexValidator(
 
 
 def mimetype_validator(mimetype: str):
-    mimetypes = [smt.value.get_mimetype() for smt in SupportedMediaType]
     if not SupportedMediaType.select_by_mime(mimetype):
+        mimetypes = [smt.value.get_mimetype() for smt in SupportedMediaType]
         msg = _(
             "The MIME type argument must match one of the supported MIME types: %s"
         ) % ", ".join(
@@ -72,14 +73,16 @@ def mimetype_validator(mimetype: str):
         raise ValidationError(msg)
 
 
+_SUPPORTED_EXTENSIONS = tuple(
+    sorted(set(chain(*[smt.value.extensions for smt in SupportedMediaType])))
+)
+
+
 def file_extension_validator(ext: str):
-    extensions = sorted(
-        set(chain(*[smt.value.extensions for smt in SupportedMediaType]))
-    )
-    if ext not in extensions:
+    if ext not in _SUPPORTED_EXTENSIONS:
         msg = _(
             "The file extension argument must match a supported file extension: %s"
-        ) % ", ".join(extensions)
+        ) % ", ".join(_SUPPORTED_EXTENSIONS)
         raise ValidationError(msg)
 
 
@@ -87,10 +90,8 @@ def tagset_validator(tag_ids: list):
     """Validates a tagset. A Sequence of positive integers."""
     msg = _("A tagset may only contain positive integers")
     try:
-        for tag_id in tag_ids:
-            if int(tag_id) < 0:
-                raise ValidationError(msg)
-
+        if any(int(tag_id) < 0 for tag_id in tag_ids):
+            raise ValidationError(msg)
     except (ValueError, TypeError) as e:
         raise ValidationError(msg) from e
 
@@ -111,17 +112,19 @@ def media_file_type_matches_ext_validator(file):
     return
 
 
+_RATING_LABELS = frozenset(x.name.lower() for x in RatingLevel)
+_RATING_LEVELS = frozenset(x.value for x in RatingLevel)
+
+
 def rating_label_validator(value: str):
-    value = value.lower()
-    rating_labels = [x.name.lower() for x in RatingLevel]
-    if value not in rating_labels:
-        label_names = ", ".join(rating_labels)
+    if value.lower() not in _RATING_LABELS:
+        label_names = ", ".join(x.name.lower() for x in RatingLevel)
         msg = f"Rating label must be one of: {label_names}"
         raise ValidationError(msg)
 
 
 def rating_level_validator(value):
-    rating_levels = [x.value for x in RatingLevel]
-    if value not in rating_levels:
+    if value not in _RATING_LEVELS:
+        rating_levels = [x.value for x in RatingLevel]
         msg = f"Rating levels must be one of {rating_levels}"
         raise ValidationError(msg)
@@ -1,9 +1,10 @@
+import functools
+import threading
 from dataclasses import dataclass
 from http import HTTPStatus
 from itertools import chain
 from pathlib import Path
 from typing import TYPE_CHECKING
-from typing import Any
 
 import markdown
 from django.conf import settings
@@ -11,9 +12,11 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import permission_required
 from django.contrib.messages.storage.base import Message
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import F
 from django.db.models import OrderBy
 from django.db.models import Q
@@ -38,6 +41,7 @@ from .components.add_tagset.add_tagset import AddTagsetComponent
 from .components.comment.comment import CommentComponent
 from .components.favorite_toggle.favorite_toggle import FavoriteToggleComponent
 from .decorators import require
+from .enums import RATING_LEVELS
 from .enums import MediaCategory
 from .enums import RatingLevel
 from .enums import SupportedMediaType
@@ -61,12 +65,17 @@ from .models import Tag
 from .models import TagAlias
 from .models import TagCategory
 from .models import Video
+from .models import add_tag_history
 from .models import csv_to_tag_ids
+from .pagination import CountedPaginator
+from .pagination import LeanCountPaginator
 from .search import PostSearch
 from .search import PostSearchTokenCategory
 from .search import SearchTokenFilterNotImplementedError
 from .search import autocomplete_tag_aliases
 from .search import autocomplete_tags
+from .signals import POST_COUNT_CACHE_KEY
+from .signals import TAGS_BY_CATEGORY_CACHE_KEY
 from .validators import media_file_supported_validator
 from .validators import media_file_type_matches_ext_validator
 from .validators import tagset_validator
@@ -95,22 +104,62 @@ class Link:
     href: str
 
 
-@require(["GET"], login=False)
-def home(request: HttpRequest) -> TemplateResponse:
-    links = [Link(link[0], link[1]) for link in settings.HOMEPAGE_LINKS]
+HOME_MARKDOWN_PATH = Path("tesys_tagboard/home.md")
+
+# Markdown instances hold parser state, so the shared one is used under a lock
+_markdown = markdown.Markdown(extensions=["sane_lists"])
+_markdown_lock = threading.Lock()
+
+# Tag post counts are updated in bulk without signals, so only keep the cached
+# tags page listing for a short while
+TAGS_BY_CATEGORY_CACHE_TIMEOUT = 60
+
+# The post count is cleared when posts are created or deleted, the timeout only
+# covers bulk operations which don't send signals
+POST_COUNT_CACHE_TIMEOUT = 60
+
+# Maximum number of tags and of aliases suggested while typing a tag name
+TAG_AUTOCOMPLETE_LIMIT = 20
+
+# Every search token category in definition order for the search help page
+TOKEN_CATEGORIES: tuple[PostSearchTokenCategory, ...] = tuple(PostSearchTokenCategory)
+
 
+@functools.lru_cache(maxsize=4)
+def _render_markdown_file(path: Path, mtime_ns: int | None) -> SafeString:
+    """Render the markdown file at `path`
+
+    `mtime_ns` is only used as part of the cache key, so the file is rendered
+    again after it's modified
+    """
     try:
-        markdown_path = Path("tesys_tagboard/home.md")
-        with Path.open(markdown_path, encoding="utf-8") as fp:
+        with Path.open(path, encoding="utf-8") as fp:
             markdown_content = fp.read()
     except OSError:
-        markdown_content = "The `home.md` file could not be found!"
+        markdown_content = f"The `{path.name}` file could not be found!"
+
+    with _markdown_lock:
+        return SafeString(_markdown.reset().convert(markdown_content))
+
+
+def render_home_markdown() -> SafeString:
+    """Return the rendered home page markdown, re-rendering only when it changes"""
+    try:
+        mtime_ns = HOME_MARKDOWN_PATH.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return _render_markdown_file(HOME_MARKDOWN_PATH, mtime_ns)
 
-    md = markdown.Markdown(extensions=["sane_lists"])
+
+@require(["GET"], login=False)
+def home(request: HttpRequest) -> TemplateResponse:
+    links = [Link(link[0], link[1]) for link in settings.HOMEPAGE_LINKS]
     context = {
         "links": links,
-        "markdown_html": SafeString(md.convert(markdown_content)),
-        "post_count": Post.posts.count(),
+        "markdown_html": render_home_markdown(),
+        "post_count": cache.get_or_set(
+            POST_COUNT_CACHE_KEY, Post.posts.count, POST_COUNT_CACHE_TIMEOUT
+        ),
     }
     return TemplateResponse(request, "pages/home.html", context)
 
@@ -118,54 +167,70 @@ def home(request: HttpRequest) -> TemplateResponse:
 @require(["GET"], login=False)
 def post(request: HtmxHttpRequest, post_id: int) -> TemplateResponse | HttpResponse:
     # GET request
-    all_posts = Post.posts.order_by("post_date").values("pk", "post_date")
-    previous_post = None
-    next_post = None
-    for i, post in enumerate(all_posts):
-        if post.get("pk") == post_id:
-            previous_post = all_posts[i - 1] if i > 0 else None
-            next_post = all_posts[i + 1] if i < len(all_posts) - 1 else None
-
     posts = Post.posts
     if request.user.is_authenticated:
         favorites = Favorite.favorites.for_user(request.user.pk)
         posts = posts.annotate_favorites(favorites)
 
-    posts = posts.filter(pk=post_id).select_related("uploader")
+    # Join the uploader and media with the post, leaving out the columns the page
+    # doesn't display
+    posts = (
+        posts.filter(pk=post_id)
+        .select_related("uploader", "image", "audio", "video")
+        .defer(
+            "uploader__password",
+            "uploader__email",
+            "image__md5",
+            "image__phash",
+            "image__dhash",
+            "audio__md5",
+            "video__md5",
+        )
+    )
 
-    post = get_object_or_404(posts.prefetch_related("posttaghistory_set"))
-    comments = post.comment_set.order_by("-post_date").select_related("user")
+    post = get_object_or_404(posts)
+
+    # Neighboring posts by post date, ties broken by ID
+    post_date = post.post_date
+    previous_post = (
+        Post.posts.filter(
+            Q(post_date__lt=post_date) | Q(post_date=post_date, pk__lt=post.pk)
+        )
+        .order_by("-post_date", "-pk")
+        .values("pk", "post_date")
+        .first()
+    )
+    next_post = (
+        Post.posts.filter(
+            Q(post_date__gt=post_date) | Q(post_date=post_date, pk__gt=post.pk)
+        )
+        .order_by("post_date", "pk")
+        .values("pk", "post_date")
+        .first()
+    )
+
+    comments = Comment.objects.for_post(post.pk)
 
     comments_pager = Paginator(comments, 10, 5)
     comments_page_num = request.GET.get("page", 1)
     comments_page = comments_pager.get_page(comments_page_num)
-    tags = Tag.tags.for_post(post)
+    # The tags are rendered on the page as well as joined into the meta
+    # keywords, so fetch them once and share the rows
+    tags = list(Tag.tags.for_post(post))
 
-    post_tag_snapshots = post.posttaghistory_set.order_by("mod_time")
-    post_tag_history_tag_ids = [
-        csv_to_tag_ids(tags_snapshot.tags) if tags_snapshot.tags.strip() != "" else []
-        for tags_snapshot in post_tag_snapshots
+    tag_history = list(post.posttaghistory_set.order_by("-mod_time"))
+    tag_history_tag_ids = [
+        csv_to_tag_ids(tag_snapshot.tags) for tag_snapshot in tag_history
     ]
-    tag_history_unique_ids = set(chain(*post_tag_history_tag_ids))
 
     # Collect tag_history tags in a single DB call
-    history_tags_by_id = {
-        tag.pk: tag
-        for tag in Tag.tags.select_related("category").filter(
-            pk__in=tag_history_unique_ids
-        )
-    }
-
-    tag_history = [
-        [history_tags_by_id.get(int(tag_id)) for tag_id in tag_ids]
-        for tag_ids in post_tag_history_tag_ids
-    ]
+    history_tags_by_id = Tag.tags.select_related("category").in_bulk(
+        set(chain.from_iterable(tag_history_tag_ids))
+    )
 
-    tag_history = post.posttaghistory_set.order_by("-mod_time")
-    for tag_snapshot in tag_history:
+    for tag_snapshot, tag_ids in zip(tag_history, tag_history_tag_ids, strict=True):
         tag_snapshot.tag_objects = [
-            history_tags_by_id.get(int(tag_id))
-            for tag_id in csv_to_tag_ids(tag_snapshot.tags)
+            history_tags_by_id.get(tag_id) for tag_id in tag_ids
         ]
 
     source_history = post.sourcehistory_set.order_by("-mod_time")
@@ -174,7 +239,7 @@ def post(request: HtmxHttpRequest, post_id: int) -> TemplateResponse | HttpRespo
         "post": post,
         "previous_post": previous_post,
         "next_post": next_post,
-        "rating_levels": list(RatingLevel),
+        "rating_levels": RATING_LEVELS,
         "tags": tags,
         "meta_tag_names": " ".join(tag.name for tag in tags),
         "comments_pager": comments_pager,
@@ -200,29 +265,34 @@ def edit_post(
             f'The user "{user.get_username()}" is not allowed to edit this post'
         )
 
-    data: dict[str, str | list[Any] | None] = {
-        key: request.POST.get(key) for key in request.POST
-    }
-    data["tagset"] = request.POST.getlist("tagset")
-
-    form = PostForm(data)
+    form = PostForm(request.POST)
     if not form.is_valid():
         return HttpUnprocessableContent("Invalid form data")
 
+    # Only write the edited columns, `edit_date` is set on every save
+    update_fields = {"edit_date"}
     if title := form.cleaned_data.get("title"):
         post.title = title
-
-    if src_url := form.cleaned_data.get("src_url"):
-        post.save_with_src_history(request.user, src_url)
+        update_fields.add("title")
 
     if rating_level := form.cleaned_data.get("rating_level"):
         post.rating_level = rating_level
+        update_fields.add("rating_level")
 
-    if tagset := form.cleaned_data.get("tagset"):
-        tags = Tag.tags.in_tagset(tagset)
-        post.save_with_tag_history(request.user, tags)
+    # Commit the tag and source history with the post in a single transaction
+    with transaction.atomic(savepoint=False):
+        if tagset := form.cleaned_data.get("tagset"):
+            # The tags live in their own table and don't need the post saved
+            tag_ids = Tag.tags.in_tagset(tagset).as_list()
+            add_tag_history(tag_ids, post, request.user)
+            post.tags.set(tag_ids)
+
+        # Saving the source history saves the post as well
+        if src_url := form.cleaned_data.get("src_url"):
+            post.save_with_src_history(request.user, src_url, update_fields)
+        else:
+            post.save(update_fields=update_fields)
 
-    post.save()
     return redirect(reverse("post", args=[post.pk]))
 
 
@@ -231,16 +301,15 @@ def edit_post(
 def delete_post(
     request: HtmxHttpRequest, post_id: int
 ) -> TemplateResponse | HttpResponse:
-    try:
-        post = Post.posts.get(pk=post_id)
-        post.delete()
-        msg = f"The post with ID {post_id} has been successfully deleted"
-        messages.add_message(request, messages.INFO, msg)
-        return redirect(reverse("posts"))
-
-    except Post.DoesNotExist:
+    # No rows are deleted when the post doesn't exist
+    num_deleted, _ = Post.posts.filter(pk=post_id).delete()
+    if num_deleted == 0:
         return HttpResponseNotFound("That post doesn't exist")
 
+    msg = f"The post with ID {post_id} has been successfully deleted"
+    messages.add_message(request, messages.INFO, msg)
+    return redirect(reverse("posts"))
+
 
 @require(["POST"], login=False)
 def confirm_tagset(request: HtmxHttpRequest):
@@ -278,23 +347,23 @@ def confirm_tagset(request: HtmxHttpRequest):
 def toggle_comment_lock(
     request: HtmxHttpRequest, post_id: int
 ) -> TemplateResponse | HttpResponse:
-    try:
-        post = Post.posts.get(pk=post_id)
-        post.locked_comments = not post.locked_comments
-        post.save()
-        return TemplateResponse(
-            request, "pages/post.html#add-comments", context={"post": post}
-        )
-
-    except Post.DoesNotExist:
+    posts = Post.posts.filter(pk=post_id)
+    # Toggle the lock in a single UPDATE
+    if not posts.update(locked_comments=~F("locked_comments")):
         return HttpResponseNotFound("That post doesn't exist")
 
+    post = posts.only("pk", "locked_comments").get()
+    return TemplateResponse(
+        request, "pages/post.html#add-comments", context={"post": post}
+    )
+
 
 @require(["GET", "POST"], login=False)
 def posts(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
     user: User | AnonymousUser = request.user
     posts = Post.posts.with_gallery_data(user)
     tags: QuerySet[Tag] | None = None
+    searched = False
 
     context = {}
     try:
@@ -303,21 +372,35 @@ def posts(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
                 context |= {"query": q}
                 ps = PostSearch(q)
                 posts = ps.get_posts().with_gallery_data(request.user)
+                searched = True
 
         elif request.POST:
             ps = PostSearch(request.POST)
+            # Anonymous searches need the gallery data as well to avoid querying
+            # every post's media and tags separately
+            posts = ps.get_posts().with_gallery_data(user)
+            searched = True
             if user.is_authenticated:
-                posts = ps.get_posts().with_gallery_data(request.user)
                 tagset = request.POST.getlist("tagset")
                 tags = Tag.tags.in_tagset(tagset)
-            else:
-                posts = ps.get_posts()
     except ValidationError as err:
         messages.add_message(request, messages.ERROR, SafeString(err.message))
     except SearchTokenFilterNotImplementedError as err:
         messages.add_message(request, messages.ERROR, SafeString(err.message))
 
-    pager = Paginator(posts, 36, 4)
+    if searched or user.is_authenticated:
+        pager = LeanCountPaginator(posts, 36, 4)
+    else:
+        # Anonymous visitors see every post when they haven't searched, so the
+        # cached total post count can be reused
+        pager = CountedPaginator(
+            posts,
+            36,
+            4,
+            count=lambda: cache.get_or_set(
+                POST_COUNT_CACHE_KEY, Post.posts.count, POST_COUNT_CACHE_TIMEOUT
+            ),
+        )
     page_num = int(request.GET.get("page", 1))
     page = pager.get_page(page_num)
 
@@ -331,12 +414,8 @@ def posts(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
 
 @require(["GET", "POST"], login=False)
 def tags(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
-    categories = TagCategory.objects.order_by("-parent", "name")
     try:
         query = request.GET.get("q", "").strip()
-        uncategorized_tags = Tag.tags.select_related("category").filter(category=None)
-        if query != "":
-            uncategorized_tags = uncategorized_tags.filter(name__icontains=query)
 
         select_related_expr = ["category"]
         select_related_expr.extend(
@@ -352,18 +431,47 @@ def tags(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
         ]
         order_by_expr.append("name")
 
-        categorized_tags = (
-            Tag.tags.select_related(*select_related_expr)
-            .filter(Q(category__name__icontains=query) | Q(name__icontains=query))
-            .filter(~Q(category=None))
-            .order_by(*order_by_expr)
+        # Categorized and uncategorized tags are fetched with a single query and
+        # split up afterwards
+        all_tags = Tag.tags.select_related(*select_related_expr).order_by(
+            *order_by_expr
         )
 
-        tags_by_cat: dict[str, list[Tag]] = {}
-        for tag in categorized_tags:
-            path = tag.category.get_full_path()
-            tags_by_cat.setdefault(path, [])
-            tags_by_cat[path].append(tag)
+        def group_by_category(
+            tags: QuerySet[Tag],
+        ) -> tuple[list[Tag], dict[str, list[Tag]]]:
+            uncategorized_tags: list[Tag] = []
+            tags_by_cat: dict[str, list[Tag]] = {}
+            # Every tag has its own copy of its category, so only build each
+            # category's path once
+            category_paths: dict[int, str] = {}
+            for tag in tags:
+                if tag.category_id is None:
+                    uncategorized_tags.append(tag)
+                    continue
+                if (path := category_paths.get(tag.category_id)) is None:
+                    path = tag.category.get_full_path()
+                    category_paths[tag.category_id] = path
+                tags_by_cat.setdefault(path, []).append(tag)
+
+            # Uncategorized tags are listed by popularity
+            uncategorized_tags.sort(key=lambda tag: tag.post_count, reverse=True)
+            return uncategorized_tags, tags_by_cat
+
+        if query == "":
+            # The unfiltered listing is the same for every visitor, so cache it.
+            # It's cleared whenever a tag or category changes.
+            uncategorized_tags, tags_by_cat = cache.get_or_set(
+                TAGS_BY_CATEGORY_CACHE_KEY,
+                lambda: group_by_category(all_tags),
+                TAGS_BY_CATEGORY_CACHE_TIMEOUT,
+            )
+        else:
+            uncategorized_tags, tags_by_cat = group_by_category(
+                all_tags.filter(
+                    Q(category__name__icontains=query) | Q(name__icontains=query)
+                )
+            )
 
         alias_query = request.GET.get("aliases", "")
         aliases = (
@@ -379,7 +487,6 @@ def tags(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
         "tags_by_cat": tags_by_cat,
         "tag_name": query,
         "aliases": aliases,
-        "categories": categories,
     }
 
     if request.htmx:
@@ -883,12 +990,11 @@ def delete_tag_category(
 @require(["GET"], login=False)
 def collections(request: HttpRequest) -> TemplateResponse:
     collections = Collection.objects.public().with_gallery_data()
-    pager = Paginator(collections, 36, 4)
+    pager = LeanCountPaginator(collections, 36, 4)
     page_num = request.GET.get("page", 1)
     page = pager.get_page(page_num)
     context = {
         "user": request.user,
-        "collections": collections,
         "pager": pager,
         "page": page,
     }
@@ -902,10 +1008,10 @@ def collection(
     user = request.user
     collection = get_object_or_404(Collection.objects.filter(pk=collection_id))
     if user == collection.user or collection.public is True:
-        posts = Post.posts.with_gallery_data(request.user).filter(
-            pk__in=collection.posts.values_list("pk", flat=True)
-        )
-        pager = Paginator(posts, 25, 5)
+        # Join through the collection's posts table instead of an `IN` subquery.
+        # A post is only in a collection once, so there are no duplicate rows
+        posts = Post.posts.with_gallery_data(request.user).filter(collection=collection)
+        pager = LeanCountPaginator(posts, 25, 5)
         page_num = request.GET.get("page", 1)
         page = pager.get_page(page_num)
         context = {
@@ -1062,7 +1168,10 @@ def delete_collection(
 
     if request.method == "DELETE":
         try:
-            collection = Collection.objects.get(user=request.user, pk=collection_id)
+            # Only the name is needed for the success message
+            collection = Collection.objects.only("pk", "name").get(
+                user=request.user, pk=collection_id
+            )
             collection.delete()
         except Collection.DoesNotExist:
             msg = Message(
@@ -1095,34 +1204,35 @@ def delete_collection(
 @permission_required(["tesys_tagboard.add_favorite"], raise_exception=True)
 def add_favorite(request: HtmxHttpRequest, post_id: int) -> HttpResponse:
     try:
-        post = Post.posts.get(pk=post_id)
-        favorite = Favorite.favorites.create(post=post, user=request.user)
-        favorite.save()
-
-        post.favorited = True
-        kwargs = {"post": post}
-        return FavoriteToggleComponent.render_to_response(
-            request=request, kwargs=kwargs
-        )
-    except Post.DoesNotExist, Favorite.DoesNotExist:
+        post = Post.posts.only("pk").get(pk=post_id)
+    except Post.DoesNotExist:
         return HttpResponse(status=404)
-    return HttpResponse("Not allowed", status=403)
+
+    # Favoriting an already favorited post is a no-op rather than an error. The
+    # `unique_favorite` constraint skips the duplicate in the same INSERT instead
+    # of checking for an existing favorite first
+    Favorite.favorites.bulk_create(
+        [Favorite(post=post, user=request.user)], ignore_conflicts=True
+    )
+
+    post.favorited = True
+    kwargs = {"post": post}
+    return FavoriteToggleComponent.render_to_response(request=request, kwargs=kwargs)
 
 
 @require(["DELETE"])
 @permission_required(["tesys_tagboard.delete_favorite"], raise_exception=True)
 def remove_favorite(request: HtmxHttpRequest, post_id: int) -> HttpResponse:
-    try:
-        post = Post.posts.get(pk=post_id)
-        Favorite.favorites.get(post=post, user=request.user).delete()
-
-        kwargs = {"post": post}
-        return FavoriteToggleComponent.render_to_response(
-            request=request, kwargs=kwargs
-        )
-    except Post.DoesNotExist, Favorite.DoesNotExist:
+    # No rows are deleted when the post doesn't exist or isn't a favorite
+    num_deleted, _ = Favorite.favorites.filter(
+        post__pk=post_id, user=request.user
+    ).delete()
+    if num_deleted == 0:
         return HttpResponse(status=404)
-    return HttpResponse("Not allowed", status=403)
+
+    # The toggle only needs the post's ID to render
+    kwargs = {"post": Post(pk=post_id)}
+    return FavoriteToggleComponent.render_to_response(request=request, kwargs=kwargs)
 
 
 @require(["POST"])
@@ -1132,19 +1242,21 @@ def add_post_to_collection(
 ) -> HttpResponse:
     try:
         collection = Collection.objects.get(user=request.user, pk=collection_id)
-        post = Post.posts.get(pk=request.POST.get("post"))
-        collection.posts.add(post)
-        collection.save()
-
-        return render(
-            request,
-            "collections/picker_item.html",
-            context={"collection": collection, "post": post, "checked": True},
-            status=200,
-        )
+        post = Post.posts.only("pk").get(pk=request.POST.get("post"))
     except Post.DoesNotExist, Collection.DoesNotExist:
         return HttpResponse("That post and/or collection doesn't exist", status=404)
 
+    # Adding to the M2M relation writes the through table directly, so the
+    # collection itself doesn't need to be saved
+    collection.posts.add(post)
+
+    return render(
+        request,
+        "collections/picker_item.html",
+        context={"collection": collection, "post": post, "checked": True},
+        status=200,
+    )
+
 
 @require(["POST"])
 @permission_required(
@@ -1155,19 +1267,18 @@ def remove_post_from_collection(
 ) -> HttpResponse:
     try:
         collection = Collection.objects.get(user=request.user, pk=collection_id)
-        post = Post.posts.get(pk=request.POST.get("post"))
-        collection.posts.remove(post)
-        collection.save()
-
-        return render(
-            request,
-            "collections/picker_item.html",
-            context={"collection": collection, "post": post, "checked": False},
-            status=200,
-        )
+        post = Post.posts.only("pk").get(pk=request.POST.get("post"))
     except Post.DoesNotExist, Collection.DoesNotExist:
         return HttpResponse(status=404)
-    return HttpResponse("Not allowed", status=403)
+
+    collection.posts.remove(post)
+
+    return render(
+        request,
+        "collections/picker_item.html",
+        context={"collection": collection, "post": post, "checked": False},
+        status=200,
+    )
 
 
 @require(["POST"])
@@ -1175,7 +1286,8 @@ def remove_post_from_collection(
 def add_comment(
     request: HtmxHttpRequest, post_id: int
 ) -> TemplateResponse | HttpResponse:
-    post = get_object_or_404(Post.posts.filter(pk=post_id))
+    # Only the comment lock is checked, the comments are rendered without the post
+    post = get_object_or_404(Post.posts.only("pk", "locked_comments"), pk=post_id)
     if post.locked_comments:
         return HttpResponseForbidden("The comments for this post are locked")
 
@@ -1191,8 +1303,8 @@ def add_comment(
         comments_page_num = request.GET.get("page", 1)
         comments_page = comments_pager.get_page(comments_page_num)
         context = {
-            "post": post,
-            "comments": comments,
+            # Only the current page of comments is rendered
+            "comments": comments_page,
             "comments_pager": comments_pager,
             "comments_page": comments_page,
         }
@@ -1228,14 +1340,21 @@ def edit_comment(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
 def delete_comment(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
     comment_id = request.POST.get("comment_id")
     try:
-        comment = Comment.objects.get(pk=comment_id)
-        if request.user != comment.user:
+        # Only the IDs are needed to check the comment's owner and render the
+        # post's remaining comments
+        comment = Comment.objects.only("user_id", "post_id").get(pk=comment_id)
+        if request.user.pk != comment.user_id:
             msg = "Only the original poster of a comment may edit it."
             return HttpResponseForbidden(msg)
-        post = comment.post
         comment.delete()
-        comments = Comment.objects.for_post(post.pk)
-        context = {"post": post, "comments": comments}
+        comments = Comment.objects.for_post(comment.post_id)
+        comments_pager = Paginator(comments, 10, 5)
+        comments_page = comments_pager.get_page(1)
+        context = {
+            "comments": comments_page,
+            "comments_pager": comments_pager,
+            "comments_page": comments_page,
+        }
         return render(request, "posts/comments.html", context=context)
     except Comment.DoesNotExist:
         return HttpResponseNotFound("That comment doesn't exist")
@@ -1272,21 +1391,16 @@ def tag_search_autocomplete(
     if request.method == "GET":
         partial = request.GET.get("partial", "")
         if request.user.is_authenticated:
-            items = chain(
-                autocomplete_tags(
-                    Tag.tags.for_user(request.user),
-                    partial,
-                ),
-                autocomplete_tag_aliases(
-                    TagAlias.aliases.for_user(request.user),
-                    partial,
-                ),
-            )
+            tags = Tag.tags.for_user(request.user)
+            aliases = TagAlias.aliases.for_user(request.user)
         else:
-            items = chain(
-                autocomplete_tags(Tag.tags.all(), partial),
-                autocomplete_tag_aliases(TagAlias.aliases.all(), partial),
-            )
+            tags = Tag.tags.all()
+            aliases = TagAlias.aliases.all()
+
+        items = chain(
+            autocomplete_tags(tags, partial, limit=TAG_AUTOCOMPLETE_LIMIT),
+            autocomplete_tag_aliases(aliases, partial, limit=TAG_AUTOCOMPLETE_LIMIT),
+        )
         context = {"items": items}
         return TemplateResponse(request, "posts/search_autocomplete.html", context)
 
@@ -1315,14 +1429,12 @@ def handle_media_upload(file: UploadedFile | None, src_url: str | None) -> tuple
         msg = "The uploaded file cannot be empty"
         raise ValidationError(msg)
 
-    if file.content_type is None:
-        msg = "File missing content type"
-        raise ValidationError(msg)
-
     validators = [
         media_file_supported_validator,
         media_file_type_matches_ext_validator,
     ]
+    # The client's content type isn't trusted, the validators replace it with the
+    # type detected from the file's contents
     for validator in validators:
         validator(file)
 
@@ -1343,91 +1455,104 @@ def handle_media_upload(file: UploadedFile | None, src_url: str | None) -> tuple
     raise ValidationError(msg)
 
 
-@require(["GET", "POST"])
-def upload(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:  # noqa: C901
+def upload_page_response(
+    request: HtmxHttpRequest, form: PostForm | None = None
+) -> TemplateResponse:
+    """Render the upload page with the default tags preselected"""
     context = {
-        "rating_levels": list(RatingLevel),
+        "rating_levels": RATING_LEVELS,
         "default_tags": [
             default.tag
             for default in DefaultPostTag.objects.select_related("tag", "tag__category")
         ],
+        "form": form,
     }
-    user = request.user
-    if request.method == "POST":
-        if not user.has_perm("tesys_tagboard.add_post"):
-            msg = f"You ({user.username}) are not allowed to create posts."
-            messages.add_message(request, messages.INFO, msg)
-            return HttpResponseForbidden()
-        data: dict[str, str | list[Any] | None] = {
-            key: request.POST.get(key) for key in request.POST
-        }
-        data["tagset"] = request.POST.getlist("tagset")
-        form = PostForm(data, request.FILES) if request.method == "POST" else PostForm()
-        context |= {"form": form}
+    return TemplateResponse(request, "pages/upload.html", context=context)
 
-        # Validate form data
-        if not form.is_valid():
-            return HttpUnprocessableContent("Invalid form data")
 
-        if tagset := form.cleaned_data.get("tagset"):
-            try:
-                tagset_validator(tagset)
-            except ValidationError:
-                return HttpUnprocessableContent("Invalid form data")
+def handle_post_upload(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
+    """Create a post from the uploaded media file and form data"""
+    user = request.user
+    if not user.has_perm("tesys_tagboard.add_post"):
+        msg = f"You ({user.username}) are not allowed to create posts."
+        messages.add_message(request, messages.INFO, msg)
+        return HttpResponseForbidden()
+    form = PostForm(request.POST, request.FILES)
+
+    # Validate form data
+    if not form.is_valid():
+        return HttpUnprocessableContent("Invalid form data")
 
+    if tagset := form.cleaned_data.get("tagset"):
         try:
-            duplicate, media_file = handle_media_upload(
-                form.files.get("file"), form.cleaned_data.get("src_url")
-            )
+            tagset_validator(tagset)
+        except ValidationError:
+            return HttpUnprocessableContent("Invalid form data")
 
-        except ValidationError as err:
-            msg = f'Failed to validate uploaded media file because: "{err.message}"'
-            messages.add_message(request, messages.INFO, msg)
-            return TemplateResponse(request, "pages/upload.html", context=context)
-        else:
-            if duplicate:
-                post_url = reverse("post", args=[duplicate.post.pk])
-                msg = mark_safe(  # noqa: S308
-                    f"The uploaded file was a duplicate of an existing post which can be found <a href='{post_url}'>here</a>"  # noqa: E501
-                )
-                messages.add_message(request, messages.WARNING, msg)
-                return TemplateResponse(request, "pages/upload.html", context=context)
+    try:
+        duplicate, media_file = handle_media_upload(
+            form.files.get("file"), form.cleaned_data.get("src_url")
+        )
 
-        try:
-            rating_level = int(form.cleaned_data.get("rating_level"))
-        except ValueError:
-            rating_level = RatingLevel.UNRATED.value
-        src_url = form.cleaned_data.get("src_url")
-        tags = Tag.tags.in_tagset(tagset)
-        if media_type := SupportedMediaType.select_by_mime(
-            media_file.file.file.content_type
-        ):
-            post = Post(
-                title=form.cleaned_data.get("title"),
-                uploader=request.user,
-                rating_level=rating_level,
-                src_url=src_url,
-                type=media_type.name,
+    except ValidationError as err:
+        msg = f'Failed to validate uploaded media file because: "{err.message}"'
+        messages.add_message(request, messages.INFO, msg)
+        return upload_page_response(request, form)
+    else:
+        if duplicate:
+            post_url = reverse("post", args=[duplicate.post.pk])
+            msg = mark_safe(  # noqa: S308
+                f"The uploaded file was a duplicate of an existing post which can be found <a href='{post_url}'>here</a>"  # noqa: E501
             )
+            messages.add_message(request, messages.WARNING, msg)
+            return upload_page_response(request, form)
+
+    try:
+        rating_level = int(form.cleaned_data.get("rating_level"))
+    except ValueError:
+        rating_level = RatingLevel.UNRATED.value
+    src_url = form.cleaned_data.get("src_url")
+    # The media's mimetype was detected from the file by `handle_media_upload`
+    if media_type := SupportedMediaType.select_by_mime(media_file.mimetype):
+        post = Post(
+            title=form.cleaned_data.get("title"),
+            uploader=request.user,
+            rating_level=rating_level,
+            src_url=src_url,
+            type=media_type.name,
+        )
+        # The post, its media and its tags are committed together so a
+        # failed write can't leave a post without media behind
+        with transaction.atomic(savepoint=False):
             post.save()
             media_file.post = post
             media_file.save()
-            post.save_with_tag_history(post.uploader, tags)
-            msg = mark_safe(  # noqa: S308
-                f"Your post was created successfully, Check it out <a href='{reverse('post', args=[post.pk])}'>here</a>"  # noqa: E501
-            )
-            messages.add_message(request, messages.INFO, msg)
+            # The post was just saved, so only its tags and history are
+            # written. Setting the post's tags only needs their IDs
+            tag_ids = Tag.tags.in_tagset(tagset).as_list()
+            post.save_with_tag_history(post.uploader, tag_ids, update_fields=())
+        msg = mark_safe(  # noqa: S308
+            f"Your post was created successfully, Check it out <a href='{reverse('post', args=[post.pk])}'>here</a>"  # noqa: E501
+        )
+        messages.add_message(request, messages.INFO, msg)
 
-        else:
-            msg = "The filetype of the uploaded file is not supported."
-            messages.add_message(request, messages.ERROR, msg)
+    else:
+        msg = "The filetype of the uploaded file is not supported."
+        messages.add_message(request, messages.ERROR, msg)
 
-    return TemplateResponse(request, "pages/upload.html", context=context)
+    return upload_page_response(request, form)
+
+
+@require(["GET", "POST"])
+def upload(request: HtmxHttpRequest) -> TemplateResponse | HttpResponse:
+    if request.method == "POST":
+        return handle_post_upload(request)
+    return upload_page_response(request)
 
 
 @require(["GET"], login=False)
 def search_help(request: HtmxHttpRequest) -> TemplateResponse:
-    context = {"token_categories": list(PostSearchTokenCategory)}
+    context = {"token_categories": TOKEN_CATEGORIES}
     return TemplateResponse(request, "pages/help.html", context)
 
 